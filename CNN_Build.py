@@ -2,74 +2,421 @@
 # Students: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
 # Description: Builds and trains the Convolutional Neural Network (CNN) model using the preprocessed image datasets.
 # Defines layers, compiles the model, and handles model training and evaluation.
+# Training options (run "python CNN_Build.py --help"):
+#   --data-source zip|extract|shipped|synthetic  training images (see image_preprocessing_file.py)
+#   --arch baseline|gap|separable|mobilenet_v2|two_headed  model architecture (see architectures.py); a two_headed
+#                                             model also serves as the plant gatekeeper (model_predict SHARED_MODEL)
+#   --intra-op-threads / --inter-op-threads   size TensorFlow's CPU thread pools explicitly
+#   --mixed-precision                         train in mixed bfloat16
+#   --strategy default|mirrored|multi-worker  tf.distribute strategy (multi-worker reads TF_CONFIG)
+#   --local-workers N                         start N multi-worker processes on this machine (for testing)
+#   --resume [RUN]                            continue a run (a folder under runs/, default the newest) from its
+#                                             latest checkpoint, optimizer state included
+# Every run gets its own folder, runs/<timestamp>_<arch>/, holding a checkpoint per epoch (checkpoints/) and the
+# per-epoch metrics (history.csv while training, history.json at the end). Model_Training_Performace_Visualization.py
+# plots them without training anything.
+# Next to the saved model files, model_info.json records each file's SHA-256 and the input scale it was trained with
+# (image_preprocessing_file.INPUT_SCALE); model_predict checks it before loading a model.
+# The test score printed here comes from the validation images for most data sources; evaluate.py scores the saved
+# model on the shipped "Plant Dataset/Test" split with a confusion matrix and per-class precision and recall.
 
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+from tensorflow.keras.models import load_model
+from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, CSVLogger, Callback, CallbackList, History
+from tensorflow.keras import mixed_precision
+import tensorflow as tf
+import argparse
+import csv
 import json
-import image_preprocessing_file as data 
-
-# Getting the variables from PreProcess_Data.py
-train_ds = data.train_ds
-val_ds = data.val_ds
-IMG_SIZE = data.IMG_SIZE
-num_classes = len(data.class_names)
-
-# Initializing the model
-model = Sequential([
-    # Adding convolutional layers (these layers learn features by applying filters to small regions of the image.
-    Conv2D(32, (3,3), activation='relu', input_shape=(IMG_SIZE[0], IMG_SIZE[1], 3)),
-    # These layers downsample the feature maps, reducing dimensionality and computational cost while retaining 
-    # important features.
-    MaxPooling2D(2,2),
-
-    Conv2D(64, (3,3), activation='relu'),
-    MaxPooling2D(2,2),
-
-    Conv2D(128, (3,3), activation='relu'),
-    MaxPooling2D(2,2),
-
-    # Converting 2D feature map into a 1D vector before connecting to fully connected layers.
-    Flatten(),
-    # Dense layers learn to classify the extracted features.
-    Dense(128, activation='relu'),
-    Dropout(0.4),
-    Dense(num_classes, activation='softmax')  # Use correct num_classes
-])
-
-# Compiling the model
-model.compile(
-    optimizer="adam",
-    loss="categorical_crossentropy",
-    metrics=["accuracy"]
-)
-
-model.summary()
-
-# Adding callbacks to stop overfitting
-callbacks = [
-    EarlyStopping(patience=3, restore_best_weights=True),
-    ModelCheckpoint("plant_health_model.keras", save_best_only=True)
-]
-
-# Training the model
-history = model.fit(
-    train_ds,
-    validation_data=val_ds,
-    epochs=10
-    callbacks=callbacks
-)
-
-# Evaluating model on test data
-test_loss, test_acc = model.evaluate(data.test_ds)
-print(f"Test Accuracy: {test_acc:.4f}")
-print(f"Test Loss: {test_loss:.4f}")
-
-# Save the model
-model.save("plant_health_model.keras")
-
-# Saving class names for later use
-with open("class_names.json", "w") as f:
-    json.dump(data.class_names, f)
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from tflite_backend import export_tflite_models
+from model_info import INFO_NAME, record_models
+from architectures import ARCHITECTURES, DEFAULT_ARCHITECTURE, build_architecture
+from image_preprocessing_file import DATA_SOURCE, IMG_SIZE, INPUT_SCALE, SOURCES, build_datasets
 
+MODEL_PATH = "plant_health_model.keras"
+CHECKPOINT_DIR = "checkpoints"  # inside each run folder
+RUNS_DIR = "runs"
+LATEST_RUN = "latest"
+EPOCHS = 10
 
+
+# Reports how long each epoch took and how many training images per second went through. Compare with
+# image_preprocessing_file.measure_throughput() to see whether training is waiting on the input pipeline.
+class EpochThroughput(Callback):
+    def __init__(self, num_images):
+        super().__init__()
+        self.num_images = num_images
+        self.start = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self.start
+        images_per_sec = self.num_images / elapsed if elapsed > 0 else 0.0
+        if logs is not None:
+            logs["epoch_time"] = elapsed
+            logs["images_per_sec"] = images_per_sec
+        print(f"Epoch {epoch + 1}: {elapsed:.1f}s, {images_per_sec:.1f} images/s")
+
+
+def build_model(num_classes, img_size, arch=DEFAULT_ARCHITECTURE):
+    # The layer stacks live in architectures.py; "baseline" is the original model
+    return build_architecture(arch, num_classes, img_size)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the plant disease CNN.")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--data-source", choices=SOURCES, default=DATA_SOURCE,
+                        help="Where the images come from (see image_preprocessing_file.py).")
+    parser.add_argument("--arch", choices=list(ARCHITECTURES),
+                        help=f"Model architecture to build (default {DEFAULT_ARCHITECTURE}; with --resume, the run's "
+                             "own architecture, and a different one is refused).")
+    parser.add_argument("--intra-op-threads", type=int, default=0,
+                        help="Threads used inside one op such as a convolution (0 = TensorFlow default).")
+    parser.add_argument("--inter-op-threads", type=int, default=0,
+                        help="Independent ops run at the same time (0 = TensorFlow default).")
+    parser.add_argument("--mixed-precision", action="store_true", help="Train with the mixed_bfloat16 policy.")
+    parser.add_argument("--strategy", choices=["default", "mirrored", "multi-worker"], default="default")
+    parser.add_argument("--local-workers", type=int, default=0,
+                        help="Start this many multi-worker processes on localhost and wait for them.")
+    parser.add_argument("--resume", nargs="?", const=LATEST_RUN, metavar="RUN",
+                        help="Continue this run from its latest checkpoint: a run folder or its name under runs/ "
+                             "(default: the newest run).")
+    parser.add_argument("--run-dir", help="Folder for a new run's checkpoints and metrics (default: a new folder "
+                                          "under runs/).")
+    return parser.parse_args(argv)
+
+
+def configure_threads(intra_op_threads, inter_op_threads):
+    # Has to run before TensorFlow executes anything, i.e. before the datasets are built.
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def make_strategy(name):
+    if name == "mirrored":
+        return tf.distribute.MirroredStrategy()
+    if name == "multi-worker":
+        return tf.distribute.MultiWorkerMirroredStrategy()
+    return tf.distribute.get_strategy()
+
+
+def is_chief(strategy):
+    # Only the chief worker writes the real model files; the other workers write to throwaway folders.
+    resolver = getattr(strategy, "cluster_resolver", None)
+    if resolver is None or resolver.task_type is None:
+        return True
+    return resolver.task_type == "chief" or (resolver.task_type == "worker" and resolver.task_id == 0)
+
+
+def model_architecture(model):
+    # Models are named after their architecture; older checkpoints ("sequential") are the baseline
+    return model.name if model.name in ARCHITECTURES else DEFAULT_ARCHITECTURE
+
+
+def latest_checkpoint(checkpoint_dir):
+    # Returns (path, completed epochs) of the newest epoch_NNN.keras file, or (None, 0).
+    best = (None, 0)
+    if not os.path.isdir(checkpoint_dir):
+        return best
+    for name in os.listdir(checkpoint_dir):
+        match = re.fullmatch(r"epoch_(\d+)\.keras", name)
+        if match and int(match.group(1)) > best[1]:
+            best = (os.path.join(checkpoint_dir, name), int(match.group(1)))
+    return best
+
+
+def worker_argv(args):
+    # Command line for one multi-worker process: the same options, minus --local-workers.
+    argv = ["--epochs", str(args.epochs), "--data-source", args.data_source, "--strategy", "multi-worker",
+            "--intra-op-threads", str(args.intra_op_threads), "--inter-op-threads", str(args.inter_op_threads)]
+    if args.arch:
+        argv += ["--arch", args.arch]
+    if args.mixed_precision:
+        argv.append("--mixed-precision")
+    if args.resume:
+        argv += ["--resume", args.resume]
+    if args.run_dir:
+        argv += ["--run-dir", args.run_dir]
+    return argv
+
+
+def launch_local_workers(args):
+    # Runs this script args.local_workers times with a TF_CONFIG describing a localhost cluster.
+    ports = []
+    for _ in range(args.local_workers):
+        with socket.socket() as s:
+            s.bind(("localhost", 0))
+            ports.append(s.getsockname()[1])
+    cluster = {"worker": [f"localhost:{port}" for port in ports]}
+
+    processes = []
+    for index in range(args.local_workers):
+        env = dict(os.environ, TF_CONFIG=json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}}))
+        cmd = [sys.executable, os.path.abspath(__file__)] + worker_argv(args)
+        processes.append(subprocess.Popen(cmd, env=env))
+    return max(p.wait() for p in processes)
+
+
+def find_run(resume):
+    # The run folder named by --resume: a path, a folder name under runs/, or LATEST_RUN for the newest run
+    if resume == LATEST_RUN:
+        runs = sorted(name for name in os.listdir(RUNS_DIR)
+                      if os.path.isdir(os.path.join(RUNS_DIR, name))) if os.path.isdir(RUNS_DIR) else []
+        if not runs:
+            raise FileNotFoundError(f"No run to resume in {RUNS_DIR}/.")
+        return os.path.join(RUNS_DIR, runs[-1])
+    for path in (resume, os.path.join(RUNS_DIR, resume)):
+        if os.path.isdir(path):
+            return path
+    raise FileNotFoundError(f"Run folder '{resume}' not found.")
+
+
+def make_run_dir(args):
+    # A resumed run keeps its own folder, so its checkpoints and history cover every epoch of that run only
+    if args.resume:
+        return find_run(args.resume)
+    if args.run_dir:
+        return args.run_dir
+    return os.path.join(RUNS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{args.arch or DEFAULT_ARCHITECTURE}")
+
+
+def write_run_summary(run_dir, args, test_loss, test_acc):
+    # history.json holds everything in history.csv (all epochs, resumed ones included) plus the run settings and the
+    # final test scores.
+    history = {}
+    with open(os.path.join(run_dir, "history.csv"), newline="") as f:
+        for row in csv.DictReader(f):
+            for name, value in row.items():
+                history.setdefault(name, []).append(int(value) if name == "epoch" else float(value))
+    summary = {
+        "settings": vars(args),
+        "input_scale": INPUT_SCALE,
+        "test_loss": float(test_loss),
+        "test_accuracy": float(test_acc),
+        "history": history,
+    }
+    with open(os.path.join(run_dir, "history.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+# TFLite has no bfloat16 kernels, so a mixed-precision model is exported from a float32 rebuild with the same weights
+# (the variables are float32 under mixed precision anyway).
+def float32_copy(model, num_classes, img_size):
+    policy = mixed_precision.global_policy()
+    mixed_precision.set_global_policy("float32")
+    try:
+        copy = build_model(num_classes, img_size, model_architecture(model))
+        copy.set_weights(model.get_weights())
+    finally:
+        mixed_precision.set_global_policy(policy)
+    return copy
+
+
+# MULTI-WORKER LOOP
+# Keras 3's fit() and evaluate() cannot consume batches that tf.distribute splits across worker processes, so the
+# multi-worker mode runs its own training step with strategy.run. The same Keras callbacks are driven by hand.
+def _distributed_batch_stats(strategy, per_replica):
+    # Sums (loss, correct predictions, examples) over all replicas and workers.
+    return [float(strategy.reduce("SUM", value, axis=None)) for value in per_replica]
+
+
+def _logs_from_stats(stats, prefix=""):
+    loss_sum, correct, count = stats
+    return {f"{prefix}loss": loss_sum / max(count, 1), f"{prefix}accuracy": correct / max(count, 1)}
+
+
+def make_distributed_steps(model, strategy):
+    loss_fn = tf.keras.losses.CategoricalCrossentropy(reduction="none")
+
+    def stats(labels, predictions, per_example_loss):
+        correct = tf.equal(tf.argmax(labels, axis=1), tf.argmax(predictions, axis=1))
+        return (tf.reduce_sum(per_example_loss), tf.reduce_sum(tf.cast(correct, tf.float32)),
+                tf.cast(tf.shape(labels)[0], tf.float32))
+
+    def train_fn(images, labels):
+        with tf.GradientTape() as tape:
+            predictions = model(images, training=True)
+            per_example_loss = loss_fn(labels, predictions)
+            loss = tf.nn.compute_average_loss(per_example_loss)
+        gradients = tape.gradient(loss, model.trainable_variables)
+        model.optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+        return stats(labels, predictions, per_example_loss)
+
+    def eval_fn(images, labels):
+        predictions = model(images, training=False)
+        return stats(labels, predictions, loss_fn(labels, predictions))
+
+    @tf.function
+    def train_step(batch):
+        return strategy.run(train_fn, args=batch)
+
+    @tf.function
+    def eval_step(batch):
+        return strategy.run(eval_fn, args=batch)
+
+    return train_step, eval_step
+
+
+def evaluate_distributed(strategy, eval_step, dataset):
+    totals = [0.0, 0.0, 0.0]
+    for batch in strategy.experimental_distribute_dataset(dataset):
+        for i, value in enumerate(_distributed_batch_stats(strategy, eval_step(batch))):
+            totals[i] += value
+    return totals
+
+
+def fit_multi_worker(model, strategy, train_ds, val_ds, epochs, initial_epoch, callbacks):
+    train_step, eval_step = make_distributed_steps(model, strategy)
+    history = History()
+    callback_list = CallbackList(callbacks + [history], model=model)
+    distributed_train = strategy.experimental_distribute_dataset(train_ds)
+
+    model.stop_training = False
+    callback_list.on_train_begin()
+    for epoch in range(initial_epoch, epochs):
+        print(f"Epoch {epoch + 1}/{epochs}")
+        callback_list.on_epoch_begin(epoch)
+        totals = [0.0, 0.0, 0.0]
+        for batch in distributed_train:
+            for i, value in enumerate(_distributed_batch_stats(strategy, train_step(batch))):
+                totals[i] += value
+        logs = _logs_from_stats(totals)
+        logs.update(_logs_from_stats(evaluate_distributed(strategy, eval_step, val_ds), prefix="val_"))
+        print(" - ".join(f"{name}: {value:.4f}" for name, value in logs.items()))
+        callback_list.on_epoch_end(epoch, logs)
+        if model.stop_training:
+            break
+    callback_list.on_train_end()
+    return history, eval_step
+
+
+def train(args):
+    configure_threads(args.intra_op_threads, args.inter_op_threads)
+    if args.mixed_precision:
+        mixed_precision.set_global_policy("mixed_bfloat16")
+    strategy = make_strategy(args.strategy)
+    chief = is_chief(strategy)
+
+    # Getting the datasets from image_preprocessing_file.py (built here so the thread settings apply to them)
+    data = build_datasets(args.data_source)
+    train_ds = data.train_ds
+    val_ds = data.val_ds
+    test_ds = data.test_ds
+    if args.strategy == "multi-worker":
+        # The images do not come from one file per element, so split the data between workers by element
+        options = tf.data.Options()
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+        train_ds = train_ds.with_options(options)
+        val_ds = val_ds.with_options(options)
+        test_ds = test_ds.with_options(options)
+    num_classes = len(data.class_names)
+
+    # Every worker resumes from the same run's checkpoint; only the chief writes into the run folder
+    run_dir = make_run_dir(args)
+    checkpoint, initial_epoch = (latest_checkpoint(os.path.join(run_dir, CHECKPOINT_DIR)) if args.resume
+                                 else (None, 0))
+    scratch_dir = None if chief else tempfile.mkdtemp()
+    model_path = MODEL_PATH if chief else os.path.join(scratch_dir, MODEL_PATH)
+    if not chief:
+        run_dir = os.path.join(scratch_dir, "run")
+    checkpoint_dir = os.path.join(run_dir, CHECKPOINT_DIR)
+    if not args.resume:
+        # A new run never starts next to another run's checkpoints (e.g. a reused --run-dir)
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    with strategy.scope():
+        if checkpoint:
+            # A .keras checkpoint holds the weights and the optimizer state, so training picks up where it stopped
+            print(f"Resuming from {checkpoint} (epoch {initial_epoch}).")
+            model = load_model(checkpoint)
+            if args.arch and args.arch != model_architecture(model):
+                raise ValueError(f"{checkpoint} is a {model_architecture(model)} model, not {args.arch}.")
+            args.arch = model_architecture(model)
+        else:
+            args.arch = args.arch or DEFAULT_ARCHITECTURE
+            model = build_model(num_classes, IMG_SIZE, args.arch)
+
+            # Compiling the model
+            model.compile(
+                optimizer="adam",
+                loss="categorical_crossentropy",
+                metrics=["accuracy"]
+            )
+
+    model.summary()
+
+    # Adding callbacks to stop overfitting, keep the best model and save a checkpoint after every epoch
+    callbacks = [
+        EarlyStopping(patience=3, restore_best_weights=True),
+        ModelCheckpoint(model_path, save_best_only=True),
+        ModelCheckpoint(os.path.join(checkpoint_dir, "epoch_{epoch:03d}.keras")),
+        EpochThroughput(data.train_count),
+        # After EpochThroughput so the epoch time and images/s are logged too
+        CSVLogger(os.path.join(run_dir, "history.csv"), append=bool(args.resume))
+    ]
+
+    # Training the model
+    if args.strategy == "multi-worker":
+        history, eval_step = fit_multi_worker(model, strategy, train_ds, val_ds, args.epochs, initial_epoch, callbacks)
+        test_loss, test_acc = _logs_from_stats(evaluate_distributed(strategy, eval_step, test_ds)).values()
+    else:
+        history = model.fit(
+            train_ds,
+            validation_data=val_ds,
+            epochs=args.epochs,
+            initial_epoch=initial_epoch,
+            callbacks=callbacks
+        )
+
+        # Evaluating model on test data
+        test_loss, test_acc = model.evaluate(test_ds)
+    print(f"Test Accuracy: {test_acc:.4f}")
+    print(f"Test Loss: {test_loss:.4f}")
+
+    # Save the model
+    model.save(model_path)
+    if not chief:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        return history
+
+    write_run_summary(run_dir, args, test_loss, test_acc)
+    print(f"Training history saved to {run_dir}")
+
+    # Saving class names for later use
+    with open("class_names.json", "w") as f:
+        json.dump(data.class_names, f)
+
+    # Exporting float16 and int8 TFLite copies for low-end laptops (pick one in model_predict with
+    # PLANT_MODEL_BACKEND). The int8 ranges are calibrated on training images.
+    tflite_paths = export_tflite_models(float32_copy(model, num_classes, IMG_SIZE) if args.mixed_precision else model,
+                                        train_ds, input_scale=INPUT_SCALE)
+
+    # model_predict refuses a model file whose recorded input scale differs from the one it feeds
+    record_models([model_path] + list(tflite_paths.values()), INPUT_SCALE, arch=args.arch, run=run_dir)
+    print(f"Input scale recorded in {INFO_NAME}")
+    return history
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.local_workers:
+        return launch_local_workers(args)
+    train(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
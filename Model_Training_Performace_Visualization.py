@@ -1,18 +1,104 @@
-import matplotlib.pyplot as plt
-from CNN_Build import *
+# Project: Plant Health Checker
+# Students: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Plots the training curves saved by CNN_Build.py in runs/<timestamp>_<arch>/. Nothing is trained here:
+# the metrics are read from history.json (or history.csv while a run is still going), so plotting takes a moment.
+# Usage:
+#   python Model_Training_Performace_Visualization.py                  newest run
+#   python Model_Training_Performace_Visualization.py runs/A runs/B    overlay the given runs
+#   python Model_Training_Performace_Visualization.py --all            overlay every run
+#   add --save curves.png to write the figure to a file instead of opening a window
 
-# Plot accuracy
-plt.plot(history.history['accuracy'], label='train accuracy')
-plt.plot(history.history['val_accuracy'], label='val accuracy')
-plt.legend()
-plt.show()
+import argparse
+import csv
+import json
+import os
+import sys
 
-# Plot loss
-plt.plot(history.history['loss'], label='train loss')
-plt.plot(history.history['val_loss'], label='val loss')
-plt.legend()
-plt.show()
+RUNS_DIR = "runs"
+
+
+def list_runs(runs_dir=RUNS_DIR):
+    # Run folders start with a timestamp, so sorting by name sorts them oldest to newest
+    if not os.path.isdir(runs_dir):
+        return []
+    return [os.path.join(runs_dir, name) for name in sorted(os.listdir(runs_dir))
+            if os.path.isdir(os.path.join(runs_dir, name))]
+
+
+def load_history(run_dir):
+    # Returns {metric: [value per epoch]}, or None if the folder has no history yet
+    json_path = os.path.join(run_dir, "history.json")
+    if os.path.exists(json_path):
+        with open(json_path) as f:
+            return json.load(f)["history"]
+
+    csv_path = os.path.join(run_dir, "history.csv")
+    if os.path.exists(csv_path):
+        history = {}
+        with open(csv_path, newline="") as f:
+            for row in csv.DictReader(f):
+                for name, value in row.items():
+                    history.setdefault(name, []).append(float(value))
+        return history
+    return None
+
+
+def plot_runs(histories, save_path=None):
+    import matplotlib
+    if save_path:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    figure, (acc_axis, loss_axis) = plt.subplots(1, 2, figsize=(12, 4.5))
+    for i, (name, history) in enumerate(histories.items()):
+        color = f"C{i}"
+        epochs = [int(e) + 1 for e in history.get("epoch", range(len(history.get("loss", []))))]
+        # Plot accuracy and loss: training solid, validation dashed, one colour per run
+        for axis, metric in ((acc_axis, "accuracy"), (loss_axis, "loss")):
+            if metric in history:
+                axis.plot(epochs, history[metric], color=color, label=f"{name} train")
+            if f"val_{metric}" in history:
+                axis.plot(epochs, history[f"val_{metric}"], color=color, linestyle="--", label=f"{name} val")
+
+    for axis, title in ((acc_axis, "Accuracy"), (loss_axis, "Loss")):
+        axis.set_title(title)
+        axis.set_xlabel("epoch")
+        axis.legend(fontsize="small")
+    figure.tight_layout()
+
+    if save_path:
+        figure.savefig(save_path, dpi=120)
+        print(f"Saved {save_path}")
+    else:
+        plt.show()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plot training curves saved by CNN_Build.py.")
+    parser.add_argument("runs", nargs="*", help="Run folders to plot (default: the newest one in runs/).")
+    parser.add_argument("--all", action="store_true", help="Overlay every run in runs/.")
+    parser.add_argument("--save", help="Write the figure to this image file instead of showing it.")
+    args = parser.parse_args(argv)
+
+    run_dirs = args.runs or (list_runs() if args.all else list_runs()[-1:])
+    histories = {}
+    for run_dir in run_dirs:
+        history = load_history(run_dir)
+        if history is None:
+            print(f"No history.json or history.csv in {run_dir}, skipping.")
+            continue
+        histories[os.path.basename(os.path.normpath(run_dir))] = history
+
+    if not histories:
+        print("No training runs found. Train with python CNN_Build.py first.")
+        return 1
+    plot_runs(histories, args.save)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
 
 # Notes:
 # Looking for validation accuracy to keep going up.
-# Would be overfitting if training accuracy goes up but validation accuracy goes down.
\ No newline at end of file
+# Would be overfitting if training accuracy goes up but validation accuracy goes down.
@@ -0,0 +1,156 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: The disease CNN architectures CNN_Build.py can train, chosen by name with --arch.
+# "baseline" is the original model. Its Flatten -> Dense(128) head sees the whole 26x26x128 feature map, so that one
+# layer holds about 11M of the model's ~11.2M parameters. The other architectures replace it with global average
+# pooling, which keeps one number per feature channel, and shrink the file, load time and memory accordingly.
+# Compare them with benchmark_architectures.py.
+# Every model takes images scaled to [0, 1] (image_preprocessing_file.train_ds) and ends in a float32 softmax, so the
+# output stays float32 when training in mixed precision. Each model is named after its architecture.
+
+from tensorflow.keras import Sequential, Model, Input
+from tensorflow.keras.layers import (
+    Conv2D, SeparableConv2D, MaxPooling2D, Flatten, Dense, Dropout, GlobalAveragePooling2D, BatchNormalization,
+    Activation, Rescaling
+)
+
+
+# 1. BUILDERS
+def build_baseline(num_classes, img_size):
+    # Initializing the model
+    return Sequential([
+        Input(shape=(img_size[0], img_size[1], 3)),
+        # Adding convolutional layers (these layers learn features by applying filters to small regions of the image.
+        Conv2D(32, (3,3), activation='relu'),
+        # These layers downsample the feature maps, reducing dimensionality and computational cost while retaining
+        # important features.
+        MaxPooling2D(2,2),
+
+        Conv2D(64, (3,3), activation='relu'),
+        MaxPooling2D(2,2),
+
+        Conv2D(128, (3,3), activation='relu'),
+        MaxPooling2D(2,2),
+
+        # Converting 2D feature map into a 1D vector before connecting to fully connected layers.
+        Flatten(),
+        # Dense layers learn to classify the extracted features.
+        Dense(128, activation='relu'),
+        Dropout(0.4),
+        # Use correct num_classes
+        Dense(num_classes, activation='softmax', dtype='float32')
+    ], name="baseline")
+
+
+def build_gap(num_classes, img_size):
+    # Same convolutions as the baseline, but the 26x26x128 feature map is averaged down to 128 values first.
+    return Sequential([
+        Input(shape=(img_size[0], img_size[1], 3)),
+        Conv2D(32, (3,3), activation='relu'),
+        MaxPooling2D(2,2),
+
+        Conv2D(64, (3,3), activation='relu'),
+        MaxPooling2D(2,2),
+
+        Conv2D(128, (3,3), activation='relu'),
+        MaxPooling2D(2,2),
+
+        GlobalAveragePooling2D(),
+        Dense(128, activation='relu'),
+        Dropout(0.4),
+        Dense(num_classes, activation='softmax', dtype='float32')
+    ], name="gap")
+
+
+def build_separable(num_classes, img_size):
+    # Depthwise-separable convolutions filter each channel on its own and then mix channels with a 1x1 convolution,
+    # about 8x fewer multiply-adds than a full 3x3 convolution. That pays for one more block (256 channels).
+    layers = [
+        Input(shape=(img_size[0], img_size[1], 3)),
+        # A normal convolution first: with only 3 input channels a separable one saves nothing
+        Conv2D(32, (3,3), activation='relu'),
+        MaxPooling2D(2,2),
+    ]
+    for filters in (64, 128, 256):
+        layers += [
+            SeparableConv2D(filters, (3,3), padding='same', use_bias=False),
+            BatchNormalization(),
+            # ReLU after the normalization, so the convolution needs no bias
+            Activation('relu'),
+            MaxPooling2D(2,2),
+        ]
+    layers += [
+        GlobalAveragePooling2D(),
+        Dropout(0.4),
+        Dense(num_classes, activation='softmax', dtype='float32')
+    ]
+    return Sequential(layers, name="separable")
+
+
+def build_mobilenet_v2(num_classes, img_size):
+    # Transfer learning: MobileNetV2 with its ImageNet weights frozen, only the new classification head is trained.
+    from tensorflow.keras.applications import MobileNetV2
+
+    backbone = MobileNetV2(input_shape=(img_size[0], img_size[1], 3), include_top=False, weights="imagenet")
+    backbone.trainable = False
+
+    inputs = Input(shape=(img_size[0], img_size[1], 3))
+    # MobileNetV2 expects pixels in [-1, 1]; the training images are in [0, 1]
+    x = Rescaling(2.0, offset=-1.0)(inputs)
+    # training=False keeps the frozen BatchNormalization layers in inference mode
+    x = backbone(x, training=False)
+    x = GlobalAveragePooling2D()(x)
+    x = Dropout(0.2)(x)
+    outputs = Dense(num_classes, activation='softmax', dtype='float32')(x)
+    return Model(inputs, outputs, name="mobilenet_v2")
+
+
+def build_two_headed(num_classes, img_size):
+    # Like mobilenet_v2, but the frozen backbone keeps its ImageNet classifier, so the same forward pass can also give
+    # the 1000 ImageNet probabilities the plant gatekeeper uses (see two_headed_outputs). Only the disease head is
+    # trained; the model built here outputs the disease classes alone, so it trains, checkpoints and exports to TFLite
+    # like any other architecture.
+    from tensorflow.keras.applications import MobileNetV2
+
+    imagenet_model = MobileNetV2(input_shape=(img_size[0], img_size[1], 3), include_top=True, weights="imagenet")
+    backbone = Model(imagenet_model.input, [imagenet_model.get_layer("out_relu").output, imagenet_model.output],
+                     name="shared_backbone")
+    backbone.trainable = False
+
+    inputs = Input(shape=(img_size[0], img_size[1], 3))
+    x = Rescaling(2.0, offset=-1.0, name="to_mobilenet_range")(inputs)
+    features, _ = backbone(x, training=False)
+    x = GlobalAveragePooling2D(name="disease_pool")(features)
+    x = Dropout(0.2, name="disease_dropout")(x)
+    outputs = Dense(num_classes, activation='softmax', dtype='float32', name="disease")(x)
+    return Model(inputs, outputs, name="two_headed")
+
+
+def two_headed_outputs(model):
+    # The layers (and weights) of a trained two_headed model, wired up to return
+    # {"disease": class probabilities, "imagenet": ImageNet probabilities} from one pass of the backbone.
+    inputs = Input(shape=model.input_shape[1:])
+    x = model.get_layer("to_mobilenet_range")(inputs)
+    features, imagenet = model.get_layer("shared_backbone")(x, training=False)
+    x = model.get_layer("disease_pool")(features)
+    x = model.get_layer("disease_dropout")(x)
+    disease = model.get_layer("disease")(x)
+    imagenet = Activation("linear", dtype="float32", name="imagenet")(imagenet)
+    return Model(inputs, {"disease": disease, "imagenet": imagenet}, name="two_headed_serving")
+
+
+# 2. REGISTRY
+ARCHITECTURES = {
+    "baseline": build_baseline,
+    "gap": build_gap,
+    "separable": build_separable,
+    "mobilenet_v2": build_mobilenet_v2,
+    "two_headed": build_two_headed,
+}
+DEFAULT_ARCHITECTURE = "baseline"
+
+
+def build_architecture(name, num_classes, img_size):
+    if name not in ARCHITECTURES:
+        raise ValueError(f"Unknown architecture {name!r}. Choose one of: {', '.join(ARCHITECTURES)}.")
+    return ARCHITECTURES[name](num_classes, img_size)
@@ -0,0 +1,201 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Command line tool that classifies every image under a folder (for example "Plant Dataset/Test" or a
+# camera dump) without the GUI. Images are decoded on a bounded thread pool, run through the disease model in batches
+# and written to a JSONL or CSV file as each batch finishes, so memory use does not grow with the folder size.
+# Files already predicted in the output are skipped, so an interrupted run can simply be started again; rows that
+# recorded an error are dropped and those files tried again. Exits with code 1 if the model cannot be loaded or every
+# image fails.
+# Usage: python batch_predict.py "Plant Dataset/Test" -o results.jsonl [--check-plant] [--batch-size 32]
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+import model_predict
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CSV_FIELDS = ["path", "class", "confidence", "is_plant", "label", "error"]
+
+
+def iter_image_paths(folder, extensions=IMAGE_EXTENSIONS, skip=()):
+    # Walks the folder tree in a stable order, yielding image paths one at a time.
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                path = os.path.normpath(os.path.join(root, name))
+                if path not in skip:
+                    yield path
+
+
+def output_format(output_path, requested=None):
+    if requested:
+        return requested
+    return "csv" if output_path.lower().endswith(".csv") else "jsonl"
+
+
+def _read_rows(output_path, fmt):
+    # Yields (raw line, parsed row) for every record; CSV rows are yielded without their header line.
+    with open(output_path, "r", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield None, row
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield line, json.loads(line)
+                except ValueError:
+                    continue  # a damaged line; the file is read as far as possible
+
+
+def _succeeded(row):
+    # CSV writes a missing error as an empty string
+    return "path" in row and not row.get("error")
+
+
+def read_done_paths(output_path, fmt):
+    # Paths that already have a successful prediction in the output file (for resuming).
+    if not os.path.exists(output_path):
+        return set()
+    return {row["path"] for _, row in _read_rows(output_path, fmt) if _succeeded(row)}
+
+
+def drop_failed_rows(output_path, fmt):
+    # Rewrites the output without the rows that recorded an error (e.g. "Model Error" when the model failed to load),
+    # so a resumed run tries those files again and each file still ends up with one row. Returns the number dropped.
+    if not os.path.exists(output_path):
+        return 0
+    rows = list(_read_rows(output_path, fmt))
+    kept = [(line, row) for line, row in rows if _succeeded(row)]
+    if len(kept) == len(rows):
+        return 0
+    tmp_path = f"{output_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(row for _, row in kept)
+        else:
+            f.writelines(line if line.endswith("\n") else line + "\n" for line, _ in kept)
+    os.replace(tmp_path, output_path)
+    return len(rows) - len(kept)
+
+
+def drop_partial_line(output_path):
+    # A run killed mid-write leaves half a record at the end of the file. Cuts the file back to its last complete line,
+    # so the fragment is neither counted as done nor glued onto the next record.
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            step = min(65536, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                position = position - step + newline + 1
+                break
+            position -= step
+        if position != end:
+            f.truncate(position)
+
+
+class ResultWriter:
+    def __init__(self, output_path, fmt, append):
+        new_file = not (append and os.path.exists(output_path) and os.path.getsize(output_path) > 0)
+        self.fmt = fmt
+        self.file = open(output_path, "a" if append else "w", newline="")
+        self.csv_writer = None
+        if fmt == "csv":
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if new_file:
+                self.csv_writer.writeheader()
+
+    def write(self, result):
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(result)
+        else:
+            self.file.write(json.dumps(result) + "\n")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify every image in a folder tree.")
+    parser.add_argument("folder", help="Folder to scan (searched recursively).")
+    parser.add_argument("-o", "--output", default="predictions.jsonl", help="Output file (.jsonl or .csv).")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Output format (default: from the file name).")
+    parser.add_argument("--batch-size", type=int, default=model_predict.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=model_predict.DECODE_WORKERS, help="Decode threads.")
+    parser.add_argument("--check-plant", action="store_true", help="Also run the plant/not-plant gatekeeper.")
+    parser.add_argument("--overwrite", action="store_true", help="Start a new output file instead of resuming.")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        print(f"Error: '{args.folder}' is not a folder.", file=sys.stderr)
+        return 1
+
+    fmt = output_format(args.output, args.format)
+    if not args.overwrite:
+        drop_partial_line(args.output)
+        retried = drop_failed_rows(args.output, fmt)
+        if retried:
+            print(f"Retrying {retried} files that failed in an earlier run.", file=sys.stderr)
+    done = set() if args.overwrite else read_done_paths(args.output, fmt)
+    if done:
+        print(f"Resuming: {len(done)} files already in {args.output}.", file=sys.stderr)
+
+    # Load the models before the clock starts so images/s only measures the inference work
+    model_predict.warm_up(background=False)
+    if (model_predict.get_shared_model() if model_predict.SHARED_MODEL else model_predict.get_model()) is None:
+        print("Error: the disease model could not be loaded; nothing was written.", file=sys.stderr)
+        return 1
+
+    writer = ResultWriter(args.output, fmt, append=not args.overwrite)
+    paths = iter_image_paths(args.folder, skip=done)
+
+    count = 0
+    errors = 0
+    start = time.perf_counter()
+    last_report = start
+    try:
+        results = model_predict.iter_batch_results(
+            paths, batch_size=args.batch_size, max_workers=args.workers, check_plant=args.check_plant
+        )
+        for result in results:
+            writer.write(result)
+            count += 1
+            if result["error"] is not None:
+                errors += 1
+            if count % args.batch_size == 0:
+                writer.flush()
+                now = time.perf_counter()
+                if now - last_report >= 5:
+                    print(f"{count} images, {count / (now - start):.1f} images/s", file=sys.stderr)
+                    last_report = now
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Done: {count} images ({errors} errors) in {elapsed:.1f}s, {rate:.1f} images/s -> {args.output}",
+          file=sys.stderr)
+    return 1 if count and errors == count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Compares the disease CNN architectures in architectures.py. For each one it reports the parameter
+# count, the size of the saved .keras file, single-image CPU latency p50/p95 (through the same ServingModel path the
+# app uses) and validation accuracy after a short training run on image_preprocessing_file's datasets.
+# Usage: python benchmark_architectures.py [--arch gap separable] [--epochs 3] [--data-source shipped] [--json out.json]
+# With --epochs 0 the models are not trained and only size and latency are measured.
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from architectures import ARCHITECTURES, build_architecture
+from image_preprocessing_file import SOURCES, build_datasets
+from model_predict import IMG_SIZE, json_path
+from serving import ServingModel
+
+
+def measure_latency(model, repeats):
+    serving = ServingModel(model)
+    image = np.random.default_rng(0).integers(0, 256, (1, IMG_SIZE[0], IMG_SIZE[1], 3)).astype(np.float32) / 255.0
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        serving.predict(image)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def saved_size_mb(model):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "model.keras")
+        model.save(path)
+        return os.path.getsize(path) / 1e6
+
+
+def compare(arch, num_classes, data, epochs, repeats):
+    model = build_architecture(arch, num_classes, IMG_SIZE)
+    result = {
+        "arch": arch,
+        "params": int(model.count_params()),
+        "trainable_params": int(sum(np.prod(w.shape) for w in model.trainable_weights)),
+        "size_mb": None,
+        "p50_ms": None,
+        "p95_ms": None,
+        "val_accuracy": None,
+    }
+
+    if data is not None and epochs > 0:
+        model.compile(optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"])
+        model.fit(data.train_ds, validation_data=data.val_ds, epochs=epochs, verbose=2)
+        result["val_accuracy"] = float(model.evaluate(data.val_ds, verbose=0)[1])
+
+    result["size_mb"] = saved_size_mb(model)
+    result["p50_ms"], result["p95_ms"] = measure_latency(model, repeats)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the disease CNN architectures.")
+    parser.add_argument("--arch", nargs="+", choices=list(ARCHITECTURES), default=list(ARCHITECTURES),
+                        help="Architectures to compare (default: all).")
+    parser.add_argument("--epochs", type=int, default=3, help="Training epochs per architecture (0 = skip training).")
+    parser.add_argument("--data-source", choices=SOURCES, help="Training images (default: PLANT_DATA_SOURCE or zip).")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed single-image predictions per architecture.")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    if args.epochs > 0:
+        data = build_datasets(args.data_source)
+        num_classes = len(data.class_names)
+    else:
+        data = None
+        with open(json_path) as f:
+            num_classes = len(json.load(f))
+
+    results = [compare(arch, num_classes, data, args.epochs, args.repeats) for arch in args.arch]
+
+    print(f"\n{'arch':<14}{'params':>12}{'trainable':>12}{'size MB':>9}{'p50 ms':>9}{'p95 ms':>9}{'val acc':>9}")
+    for r in results:
+        accuracy = "n/a" if r["val_accuracy"] is None else f"{r['val_accuracy'] * 100:.1f}%"
+        print(f"{r['arch']:<14}{r['params']:>12,}{r['trainable_params']:>12,}{r['size_mb']:>9.2f}"
+              f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{accuracy:>9}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Compares the disease model backends (Keras float32, TFLite float16, TFLite int8) on the images in
+# "Plant Dataset/Test". Reports load time (in a fresh process), single-image latency p50/p95, file size and top-1
+# agreement with the Keras model. Run CNN_Build.py first so the .tflite files exist.
+# Usage: python benchmark_backends.py [--folder "Plant Dataset/Test"] [--repeats 5]
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import model_predict
+from batch_predict import iter_image_paths
+
+DEFAULT_FOLDER = os.path.join(model_predict.BASE_DIR, "Plant Dataset", "Test")
+
+
+def measure_load_time(backend):
+    # Loading in a fresh process so library imports are counted too, the same as a cold start of the app.
+    code = (
+        "import time; start = time.perf_counter(); import model_predict; "
+        f"model_predict.set_backend({backend!r}); assert model_predict.get_model() is not None; "
+        "print('LOAD', time.perf_counter() - start)"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=model_predict.BASE_DIR, capture_output=True, text=True)
+    for line in output.stdout.splitlines():
+        if line.startswith("LOAD "):
+            return float(line.split()[1])
+    return None
+
+
+def run_backend(backend, images, repeats):
+    model_predict.set_backend(backend)
+    model = model_predict.get_model()
+    if model is None:
+        return None
+
+    model.predict(model_predict._disease_input(images[:1]), verbose=0)  # warm-up call, not timed
+    latencies = []
+    probabilities = []
+    for i in range(len(images)):
+        batch = model_predict._disease_input(images[i:i + 1])
+        for _ in range(repeats):
+            start = time.perf_counter()
+            probs = model.predict(batch, verbose=0)
+            latencies.append((time.perf_counter() - start) * 1000)
+        probabilities.append(probs[0])
+    return np.array(latencies), np.array(probabilities)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Keras and TFLite disease model backends.")
+    parser.add_argument("--folder", default=DEFAULT_FOLDER, help="Folder of test images.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed predictions per image.")
+    args = parser.parse_args()
+
+    paths = list(iter_image_paths(args.folder))
+    if not paths:
+        print(f"No images found in {args.folder}")
+        return 1
+    images = np.stack([model_predict.load_image_uint8(p) for p in paths])
+    print(f"{len(paths)} test images from {args.folder}\n")
+
+    reference = None
+    print(f"{'backend':<13}{'size MB':>9}{'load s':>9}{'p50 ms':>9}{'p95 ms':>9}{'top-1 agree':>13}")
+    for backend in model_predict.BACKENDS:
+        path = model_predict.disease_model_path(backend)
+        if not os.path.exists(path):
+            print(f"{backend:<13}  (missing {os.path.basename(path)})")
+            continue
+
+        result = run_backend(backend, images, args.repeats)
+        if result is None:
+            print(f"{backend:<13}  (failed to load)")
+            continue
+        latencies, probabilities = result
+        top1 = probabilities.argmax(axis=1)
+        if backend == "keras":
+            reference = top1
+        agreement = "n/a" if reference is None else f"{np.mean(top1 == reference) * 100:.1f}%"
+
+        load_time = measure_load_time(backend)
+        load_text = "n/a" if load_time is None else f"{load_time:.2f}"
+        print(f"{backend:<13}{os.path.getsize(path) / 1e6:>9.2f}{load_text:>9}"
+              f"{np.percentile(latencies, 50):>9.2f}{np.percentile(latencies, 95):>9.2f}{agreement:>13}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Compares MobileNetV2 sizes as the plant gatekeeper (model_predict.GATEKEEPERS). For each one it reports
+# single-image latency p50/p95 (resize, forward pass and plant verdict), batched throughput, how many of the photos it
+# calls a plant and how often its verdict agrees with the first gatekeeper listed (the full 1.0_224 model by default).
+# Usage: python benchmark_gatekeeper.py [--gatekeepers 1.0_224 0.5_160 0.35_128] [--folder "Plant Dataset/Test"]
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import model_predict
+from batch_predict import iter_image_paths
+
+DEFAULT_FOLDER = os.path.join(model_predict.BASE_DIR, "Plant Dataset", "Test")
+
+
+def load_batch(paths):
+    return np.stack([model_predict.load_image_uint8(path) for path in paths])
+
+
+def measure(gatekeeper, images, repeats, batch_size):
+    model_predict.set_gatekeeper(gatekeeper)
+    single = images[:1]
+    model_predict._run_validator(single, verbose=0)  # loads the model; not timed
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model_predict._run_validator(single, verbose=0)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    verdicts = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        verdicts.extend(model_predict._run_validator(images[i:i + batch_size], verbose=0))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "gatekeeper": gatekeeper,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "images_per_s": len(images) / max(elapsed, 1e-9),
+        "plant_rate": float(np.mean([is_plant for is_plant, _ in verdicts])),
+        "verdicts": verdicts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare MobileNetV2 sizes as the plant gatekeeper.")
+    parser.add_argument("--gatekeepers", nargs="+", choices=model_predict.GATEKEEPERS,
+                        default=list(model_predict.GATEKEEPERS),
+                        help="Gatekeepers to compare; agreement is measured against the first one.")
+    parser.add_argument("--folder", default=DEFAULT_FOLDER, help="Folder of test photos.")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed single-image checks per gatekeeper.")
+    parser.add_argument("--batch-size", type=int, default=model_predict.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    paths = list(iter_image_paths(args.folder))
+    if not paths:
+        print(f"No images found in {args.folder}")
+        return 1
+    images = load_batch(paths)
+
+    original = model_predict.GATEKEEPER
+    try:
+        results = [measure(gatekeeper, images, args.repeats, args.batch_size) for gatekeeper in args.gatekeepers]
+    finally:
+        model_predict.set_gatekeeper(original)
+
+    reference = [is_plant for is_plant, _ in results[0]["verdicts"]]
+    for r in results:
+        r["agreement"] = float(np.mean([v[0] == ref for v, ref in zip(r.pop("verdicts"), reference)]))
+
+    print(f"\n{len(paths)} images, threshold {model_predict.PLANT_THRESHOLD}, agreement with {args.gatekeepers[0]}")
+    print(f"{'gatekeeper':<12}{'p50 ms':>9}{'p95 ms':>9}{'img/s':>9}{'plant':>8}{'agree':>8}")
+    for r in results:
+        print(f"{r['gatekeeper']:<12}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['images_per_s']:>9.1f}"
+              f"{r['plant_rate'] * 100:>7.1f}%{r['agreement'] * 100:>7.1f}%")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Compares the two ways model_predict can answer "is it a plant, and which disease": the two-model path
+# (the MobileNetV2 gatekeeper plus the disease model, two forward passes) and the two-headed model from
+# "CNN_Build.py --arch two_headed" (one pass of a shared MobileNetV2 backbone, see model_predict.SHARED_MODEL).
+# For each path it reports analyze_image latency p50/p95 and batched throughput with both outputs, plus how often the
+# two paths give the same plant verdict. The prediction cache is switched off so every call does the full work.
+# Usage: python benchmark_shared_model.py [--folder "Plant Dataset/Test"] [--untrained]
+# plant_health_model.keras must be a two_headed model; --untrained builds one with an untrained disease head instead
+# (the plant verdicts and timings are the same, the disease classes are meaningless).
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import model_predict
+from batch_predict import iter_image_paths
+
+DEFAULT_FOLDER = os.path.join(model_predict.BASE_DIR, "Plant Dataset", "Test")
+PATHS = {"two-model": False, "shared": True}
+
+
+def use_untrained_model():
+    from architectures import build_architecture, two_headed_outputs
+    from serving import ServingModel
+
+    model = build_architecture("two_headed", len(model_predict.get_class_names()), model_predict.IMG_SIZE)
+    model_predict.registry.set("disease", ServingModel(model))
+    model_predict.registry.set("shared", ServingModel(two_headed_outputs(model)))
+
+
+def measure(name, paths, repeats, batch_size):
+    model_predict.set_shared_model(PATHS[name])
+    model_predict.analyze_image(paths[0])  # loads the models; not timed
+    latencies = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        model_predict.analyze_image(paths[i % len(paths)])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    results = list(model_predict.iter_batch_results(paths, batch_size, predict=True, check_plant=True))
+    elapsed = time.perf_counter() - start
+    return {
+        "path": name,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "images_per_s": len(paths) / max(elapsed, 1e-9),
+        "verdicts": [r["is_plant"] for r in results],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the two-model path with the two-headed model.")
+    parser.add_argument("--folder", default=DEFAULT_FOLDER, help="Folder of test photos.")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed analyze_image calls per path.")
+    parser.add_argument("--batch-size", type=int, default=model_predict.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--untrained", action="store_true",
+                        help="Use an untrained two_headed model instead of plant_health_model.keras.")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    paths = list(iter_image_paths(args.folder))
+    if not paths:
+        print(f"No images found in {args.folder}")
+        return 1
+
+    model_predict.CACHE_ENABLED = False
+    if args.untrained:
+        use_untrained_model()
+    original = model_predict.SHARED_MODEL
+    try:
+        results = [measure(name, paths, args.repeats, args.batch_size) for name in PATHS]
+    finally:
+        model_predict.set_shared_model(original)
+
+    reference = results[0]["verdicts"]
+    for r in results:
+        r["agreement"] = float(np.mean([a == b for a, b in zip(r.pop("verdicts"), reference)]))
+
+    print(f"\n{len(paths)} images, plant verdict agreement with the two-model path")
+    print(f"{'path':<12}{'p50 ms':>9}{'p95 ms':>9}{'img/s':>9}{'agree':>8}")
+    for r in results:
+        print(f"{r['path']:<12}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['images_per_s']:>9.1f}"
+              f"{r['agreement'] * 100:>7.1f}%")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Measures GUI startup time. Each mode runs in a fresh Python process and reports time-to-first-window
+# and time-to-first-prediction, both counted from process start.
+#   eager - the old behaviour: every model is loaded before the window is built (like the old import side effects).
+#   lazy  - the current behaviour: the window is built first and the models warm up on a background thread.
+# Usage: python benchmark_startup.py [--image path/to/leaf.jpg] [--runs 3]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_IMAGE = os.path.join(BASE_DIR, "Plant Dataset", "Test", "Healthy", "8ddaac1bd6c8cd0a.jpg")
+
+
+def run_child(mode, image_path):
+    # Runs inside the measured process. Prints one JSON line with the timings.
+    start = time.perf_counter()
+    result = {"mode": mode, "window_s": None, "first_prediction_s": None, "display": True}
+
+    import gui_interface
+    import model_predict
+    result["import_s"] = time.perf_counter() - start
+
+    if mode == "eager":
+        model_predict.warm_up(background=False)
+
+    before_window = time.perf_counter() - start
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        gui_interface.PlantHealthApp(root)
+        root.update()
+        result["window_s"] = time.perf_counter() - start
+    except Exception:
+        # No display available (e.g. a headless build box): report when the window would have been built
+        result["display"] = False
+        result["window_s"] = before_window
+        root = None
+        if mode == "lazy":
+            model_predict.warm_up(background=True)
+
+    if root is not None and mode == "lazy":
+        # Give the app's own after() callback a chance to start the background warm-up
+        root.after(100)
+        root.update()
+
+    model_predict.check_if_plant(image_path)
+    model_predict.predict_image(image_path)
+    result["first_prediction_s"] = time.perf_counter() - start
+
+    if root is not None:
+        root.destroy()
+    print("RESULT " + json.dumps(result))
+
+
+def measure(mode, image_path):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--image", image_path],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    for line in output.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise RuntimeError(f"{mode} run failed:\n{output.stderr[-2000:]}")
+
+
+def format_seconds(value):
+    return "n/a" if value is None else f"{value:.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare eager vs lazy model loading at startup.")
+    parser.add_argument("--image", default=DEFAULT_IMAGE, help="Image used for the first prediction.")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per mode (the best run is reported).")
+    parser.add_argument("--child", choices=["eager", "lazy"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.image)
+        return
+
+    print(f"{'mode':<8}{'import':>10}{'first window':>15}{'first prediction':>19}")
+    for mode in ("eager", "lazy"):
+        runs = [measure(mode, args.image) for _ in range(args.runs)]
+        best = min(runs, key=lambda r: r["first_prediction_s"])
+        print(f"{mode:<8}{format_seconds(best['import_s']):>10}{format_seconds(best['window_s']):>15}"
+              f"{format_seconds(best['first_prediction_s']):>19}")
+        if not best["display"]:
+            print("        (no display available: window time is when the window would have been built)")
+
+
+if __name__ == "__main__":
+    main()
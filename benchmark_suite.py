@@ -0,0 +1,222 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Speed benchmarks for the app, run offline on synthetic images from 224px up to 24MP camera frames.
+# Measures predict_image and check_if_plant latency, batched throughput (predict_images), the tf.data input pipeline
+# of image_preprocessing_file and the preview rendering in PlantHealthApp.show_image_on_right. Results are written to
+# JSON; --baseline compares them with an earlier results file and flags metrics that got worse.
+# Usage:
+#   python benchmark_suite.py --output benchmark_results.json
+#   python benchmark_suite.py --baseline benchmark_baseline.json --tolerance 0.2    (exit code 1 on a regression)
+#   python benchmark_suite.py --models synthetic --sizes 224 12mp                   (untrained models, no files needed)
+# The prediction cache is switched off so every call does the full work. --stages also records the per-stage timings
+# from instrumentation.py (read, decode, resize, gatekeeper, disease, postprocess) in the report.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+import instrumentation
+import model_predict
+from gui_interface import PREVIEW_SIZE
+from thumbnail_cache import make_thumbnail
+
+# name: (width, height)
+IMAGE_SIZES = {
+    "224": (224, 224),
+    "vga": (640, 480),
+    "1080p": (1920, 1080),
+    "12mp": (4000, 3000),
+    "24mp": (6000, 4000),
+}
+BATCH_IMAGES = 32
+
+
+# 1. SYNTHETIC INPUTS
+def make_image(path, width, height, seed=0):
+    # A smooth green/brown gradient with some noise: compresses about like a photo, unlike pure noise.
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    image = np.empty((height, width, 3), dtype=np.float32)
+    image[..., 0] = 60 + 90 * x * y
+    image[..., 1] = 110 + 100 * (1 - y) * x
+    image[..., 2] = 40 + 50 * y
+    image += rng.normal(0, 12, (height, width, 1)).astype(np.float32)
+    Image.fromarray(np.clip(image, 0, 255).astype(np.uint8)).save(path, quality=90)
+    return path
+
+
+def use_synthetic_models():
+    # Untrained models with the real input and output shapes, so the benchmark runs without the trained model, the
+    # ImageNet weights or a network connection. Timings are the same; the predicted labels are meaningless.
+    from tensorflow.keras.applications import MobileNetV2
+    from architectures import build_architecture
+    from serving import ServingModel
+
+    class_names = [f"class_{i}" for i in range(3)]
+    model_predict.registry.set("class_names", class_names)
+    model_predict.registry.set("disease", ServingModel(
+        build_architecture("baseline", len(class_names), model_predict.IMG_SIZE)))
+    alpha, size = model_predict.gatekeeper_spec()
+    model_predict.registry.set("validator", ServingModel(
+        MobileNetV2(input_shape=(size, size, 3), alpha=alpha, weights=None)))
+    # Placeholder ImageNet labels, so the real ones are not downloaded
+    model_predict.registry.set("imagenet_labels", [f"imagenet_{i}" for i in range(1000)])
+
+
+# 2. MEASUREMENTS
+def time_calls(function, repeats):
+    function()  # first call not timed (graph tracing, file system cache)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(times, 50)), float(np.percentile(times, 95))
+
+
+def make_preview_renderer():
+    # Times the real PlantHealthApp.show_image_on_right when a display is available. Without one (CI, SSH) only the
+    # image work before the Tk PhotoImage is timed.
+    from types import SimpleNamespace
+    import gui_interface
+
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+    except Exception:
+        return "pil-only", gui_interface.load_preview_image
+
+    app = SimpleNamespace(image_label=tk.Label(root))
+
+    def render(path):
+        gui_interface.PlantHealthApp.show_image_on_right(app, path)
+        root.update_idletasks()
+    return "tk", render
+
+
+def add_metric(results, name, value, unit, better):
+    results[name] = {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def bench_image_size(results, label, path, repeats, render):
+    p50, p95 = time_calls(lambda: model_predict.predict_image(path), repeats)
+    add_metric(results, f"predict_image/{label}/p50", p50, "ms", "lower")
+    add_metric(results, f"predict_image/{label}/p95", p95, "ms", "lower")
+
+    p50, p95 = time_calls(lambda: model_predict.check_if_plant(path), repeats)
+    add_metric(results, f"check_if_plant/{label}/p50", p50, "ms", "lower")
+    add_metric(results, f"check_if_plant/{label}/p95", p95, "ms", "lower")
+
+    # Cold: decoding a new photo into a preview. Warm: the same photo again, answered by the thumbnail cache.
+    p50, _ = time_calls(lambda: make_thumbnail(path, PREVIEW_SIZE), repeats)
+    add_metric(results, f"preview_render/{label}/cold_p50", p50, "ms", "lower")
+    p50, _ = time_calls(lambda: render(path), repeats)
+    add_metric(results, f"preview_render/{label}/p50", p50, "ms", "lower")
+
+    paths = [path] * BATCH_IMAGES
+    model_predict.predict_images(paths[:2])  # warm-up
+    start = time.perf_counter()
+    model_predict.predict_images(paths)
+    elapsed = time.perf_counter() - start
+    add_metric(results, f"predict_images/{label}/throughput", BATCH_IMAGES / elapsed, "images/s", "higher")
+
+
+def bench_pipeline(results, source):
+    from image_preprocessing_file import build_datasets, measure_throughput
+    try:
+        data = build_datasets(source)
+    except Exception as e:
+        print(f"Skipping tf.data pipeline benchmark: {e}")
+        return
+    (_, first_rate), (_, cached_rate) = measure_throughput(data.train_ds, num_epochs=2)
+    add_metric(results, "tf_data/train/first_epoch", first_rate, "images/s", "higher")
+    add_metric(results, "tf_data/train/cached_epoch", cached_rate, "images/s", "higher")
+
+
+# 3. BASELINE COMPARISON
+def compare(results, baseline, tolerance):
+    # A metric regresses when it is worse than the baseline by more than the tolerance (0.2 = 20%).
+    regressions = []
+    print(f"\n{'metric':<40}{'baseline':>12}{'now':>12}{'change':>9}")
+    for name, metric in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["value"], metric["value"]
+        change = (new - old) / old if old else 0.0
+        worse = change > tolerance if metric["better"] == "lower" else change < -tolerance
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<40}{old:>12.2f}{new:>12.2f}{change * 100:>8.1f}%{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark prediction, preprocessing and preview rendering.")
+    parser.add_argument("--sizes", nargs="+", choices=list(IMAGE_SIZES), default=list(IMAGE_SIZES))
+    parser.add_argument("--repeats", type=int, default=10, help="Timed calls per measurement.")
+    parser.add_argument("--models", choices=["real", "synthetic"], default="real",
+                        help="real: the trained model files; synthetic: untrained models of the same shape.")
+    parser.add_argument("--stages", action="store_true", help="Record per-stage timings as well.")
+    parser.add_argument("--skip-pipeline", action="store_true", help="Do not benchmark the tf.data pipeline.")
+    parser.add_argument("--data-source", help="Dataset source for the pipeline benchmark (see image_preprocessing_file).")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%).")
+    args = parser.parse_args(argv)
+
+    model_predict.CACHE_ENABLED = False
+    if args.models == "synthetic":
+        use_synthetic_models()
+    model_predict.warm_up()
+    if args.stages:
+        instrumentation.enable()
+
+    render_mode, render = make_preview_renderer()
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for label in args.sizes:
+            width, height = IMAGE_SIZES[label]
+            path = make_image(os.path.join(folder, f"{label}.jpg"), width, height)
+            print(f"Benchmarking {label} ({width}x{height}, {os.path.getsize(path) / 1e6:.1f} MB)...")
+            bench_image_size(results, label, path, args.repeats, render)
+    if not args.skip_pipeline:
+        bench_pipeline(results, args.data_source)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "settings": {"models": args.models, "backend": model_predict.BACKEND, "repeats": args.repeats,
+                     "preview_render": render_mode},
+        "results": results,
+    }
+    if args.stages:
+        report["stages"] = instrumentation.snapshot()
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, metric in results.items():
+        print(f"{name:<40}{metric['value']:>12.2f} {metric['unit']}")
+    print(f"Saved {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance * 100:.0f}%.")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Checks that the reduced-size JPEG decode in model_predict (FAST_DECODE) gives the same answers as
+# decoding at full size. For every image it runs both decodes through the disease model and the gatekeeper, then
+# reports decode times, top-1 agreement and the largest change in any class probability. Exits with code 1 if a
+# prediction changes or a probability moves by more than --tolerance.
+# Usage: python check_fast_decode.py [--folder "Plant Dataset/Test"] [--tolerance 0.05]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+import model_predict
+from batch_predict import iter_image_paths
+
+DEFAULT_FOLDER = os.path.join(model_predict.BASE_DIR, "Plant Dataset", "Test")
+DEFAULT_TOLERANCE = 0.05
+
+
+def timed_load(path, fast_decode):
+    start = time.perf_counter()
+    image = model_predict.load_image_uint8(path, fast_decode=fast_decode)
+    return image, (time.perf_counter() - start) * 1000
+
+
+# Returns one dict per image: decode times, whether the top-1 disease class and gatekeeper class stayed the same, and
+# the largest absolute probability difference of either model.
+def compare_decodes(paths):
+    model = model_predict.get_model()
+    validator = model_predict.get_validator_model()
+    results = []
+    for path in paths:
+        full, full_ms = timed_load(path, fast_decode=False)
+        fast, fast_ms = timed_load(path, fast_decode=True)
+        batch = np.stack([full, fast])
+        disease = model.predict(model_predict._disease_input(batch), verbose=0)
+        gatekeeper = validator.predict(model_predict._validator_input(batch), verbose=0)
+        results.append({
+            "path": path,
+            "full_ms": full_ms,
+            "fast_ms": fast_ms,
+            "same_class": bool(disease[0].argmax() == disease[1].argmax()),
+            "same_gatekeeper": bool(gatekeeper[0].argmax() == gatekeeper[1].argmax()),
+            "max_prob_diff": float(max(np.abs(disease[0] - disease[1]).max(),
+                                       np.abs(gatekeeper[0] - gatekeeper[1]).max())),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fast (reduced-size) and full JPEG decoding.")
+    parser.add_argument("--folder", default=DEFAULT_FOLDER, help="Folder of test photos.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Largest allowed change in any class probability (0-1).")
+    args = parser.parse_args()
+
+    paths = list(iter_image_paths(args.folder))
+    if not paths:
+        print(f"No images found in {args.folder}")
+        return 1
+
+    results = compare_decodes(paths)
+    for r in results:
+        print(f"{os.path.basename(r['path']):<28}{r['full_ms']:>8.1f} ms{r['fast_ms']:>8.1f} ms"
+              f"  class {'same' if r['same_class'] else 'CHANGED'}"
+              f"  gatekeeper {'same' if r['same_gatekeeper'] else 'CHANGED'}  max diff {r['max_prob_diff']:.4f}")
+
+    full_total = sum(r["full_ms"] for r in results)
+    fast_total = sum(r["fast_ms"] for r in results)
+    failures = [r for r in results
+                if not (r["same_class"] and r["same_gatekeeper"]) or r["max_prob_diff"] > args.tolerance]
+    print(f"\nDecode time: {full_total / len(results):.1f} ms full, {fast_total / len(results):.1f} ms fast "
+          f"({full_total / max(fast_total, 1e-9):.1f}x faster)")
+    print(f"Largest probability change: {max(r['max_prob_diff'] for r in results):.4f} "
+          f"(tolerance {args.tolerance})")
+    if failures:
+        print(f"{len(failures)} of {len(results)} images outside tolerance.")
+        return 1
+    print(f"All {len(results)} images within tolerance.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Content hashing helpers. Files are identified by the SHA-256 of their bytes, so the same photo gets the
+# same key wherever it lives on disk. Hashes are remembered per (path, size, mtime) so an unchanged file is only read
+# once per process; the memo keeps the MAX_MEMO_ENTRIES most recently used files, so a long-running GUI or server that
+# sees thousands of photos does not grow without limit.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+CHUNK_SIZE = 1024 * 1024
+MAX_MEMO_ENTRIES = 4096
+
+_digest_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+def bytes_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# Returns the SHA-256 hex digest of the file's contents.
+def file_digest(path):
+    key = _stat_key(path)
+    with _memo_lock:
+        if key in _digest_memo:
+            _digest_memo.move_to_end(key)
+            return _digest_memo[key]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _memo_lock:
+        _digest_memo[key] = digest
+        while len(_digest_memo) > MAX_MEMO_ENTRIES:
+            _digest_memo.popitem(last=False)
+    return digest
+
+
+# Combines the contents of several files (plus any extra strings) into one short fingerprint. A missing file counts
+# as "missing", so creating it later changes the fingerprint.
+def files_fingerprint(paths, extra=()):
+    sha = hashlib.sha256()
+    for path in paths:
+        sha.update(os.path.basename(path).encode())
+        sha.update(file_digest(path).encode() if os.path.exists(path) else b"missing")
+    for item in extra:
+        sha.update(str(item).encode())
+    return sha.hexdigest()[:16]
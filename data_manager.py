@@ -1,29 +1,123 @@
 # Project: Plant Health Checker
 # Students: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
 # Description: This class handles loading and processing the plant dataset.
+# Parsing a large CSV is slow, so the first load also writes a columnar copy (a Feather / Arrow IPC file in cache/)
+# and later loads memory-map that instead. The copy is rebuilt whenever the CSV's size or modification time changes.
+# Only the requested columns are read (projection), column types can be pinned, and iter_chunks() / filter_rows() walk
+# the data in pieces so a large dataset can be filtered without holding all of it in memory.
+# The Feather cache needs pyarrow; without it the CSV is read directly, with the same projection and chunking.
 
 import pandas as pd
+import hashlib
+import json
 import os
+import threading
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "cache", "datasets")
+DEFAULT_CHUNK_SIZE = 50000
 
 
 #A class to manage loading and retrieving plant health data.
 class PlantDataManager:
-    def __init__(self, csv_path):
+    def __init__(self, csv_path, dtypes=None, cache_dir=CACHE_DIR, use_cache=True):
         self.csv_path = csv_path
+        # Optional {column: dtype} applied when the CSV is parsed, e.g. {"plant": "category", "score": "float32"},
+        # so the types do not depend on what pandas guesses from the data.
+        self.dtypes = dict(dtypes or {})
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache and feather is not None
         self.data = None
+        # Set once a load_dataset() call has finished, successfully or not (see load_in_background)
+        self.loaded = threading.Event()
 
-    def load_dataset(self):
-        # Reads the CSV file using Pandas and stores it in self.data.
+        name = os.path.splitext(os.path.basename(csv_path))[0]
+        path_hash = hashlib.sha256(os.path.abspath(csv_path).encode()).hexdigest()[:12]
+        self.cache_path = os.path.join(cache_dir, f"{name}-{path_hash}.feather")
+        self.meta_path = self.cache_path + ".json"
+
+    def load_dataset(self, columns=None):
+        # Reads the dataset (only the given columns, or all of them) and stores it in self.data.
         # Returns true if successful, false if the file is not found.
         try:
-            # Using pandas to read the file (Advanced Module Requirement)
-            self.data = pd.read_csv(self.csv_path)
+            if self.use_cache:
+                self.data = self._read_table(columns).to_pandas()
+            else:
+                # Using pandas to read the file (Advanced Module Requirement)
+                self.data = pd.read_csv(self.csv_path, usecols=columns, dtype=self.dtypes or None)
             print("Success: Dataset loaded!")
             return True
         except FileNotFoundError:
             print(f"Error: The file at {self.csv_path} was not found.")
             return False
+        finally:
+            self.loaded.set()
+
+    # Starts load_dataset() on a daemon thread and returns straight away, so a window can open while the data loads.
+    # self.loaded is set when it finishes.
+    def load_in_background(self, columns=None):
+        self.loaded.clear()
+        thread = threading.Thread(target=self.load_dataset, args=(columns,), daemon=True, name="dataset-load")
+        thread.start()
+        return thread
 
     # Returns the entire dataframe.
     def get_all_data(self):
         return self.data
+
+    # Yields the dataset as DataFrames of at most chunk_size rows, reading only the given columns. Nothing is kept
+    # between chunks, so memory use depends on the chunk size rather than the dataset size.
+    def iter_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+        if self.use_cache:
+            for batch in self._read_table(columns).to_batches(max_chunksize=chunk_size):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(self.csv_path, usecols=columns, dtype=self.dtypes or None, chunksize=chunk_size)
+
+    # Returns the rows for which predicate(chunk) is true, e.g. filter_rows(lambda df: df["plant"] == "Tomato").
+    # The predicate gets one chunk at a time and returns a boolean Series for it.
+    def filter_rows(self, predicate, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        parts = [chunk[predicate(chunk)] for chunk in self.iter_chunks(chunk_size, columns)]
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(parts, ignore_index=True)
+
+    # COLUMNAR CACHE
+    def _csv_signature(self):
+        st = os.stat(self.csv_path)  # raises FileNotFoundError for a missing CSV, like pd.read_csv
+        return {"csv": os.path.abspath(self.csv_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                "dtypes": {column: str(dtype) for column, dtype in sorted(self.dtypes.items())}}
+
+    def _cache_is_fresh(self, signature):
+        if not (os.path.exists(self.cache_path) and os.path.exists(self.meta_path)):
+            return False
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f) == signature
+        except (OSError, ValueError):
+            return False
+
+    def _rebuild_cache(self, signature):
+        # The CSV is parsed in one go so every column gets a single type (pandas guesses types per chunk). This is the
+        # same cost as the old load, paid only when the CSV changes. Written uncompressed so it can be memory-mapped,
+        # and swapped in only when complete.
+        print(f"Building columnar cache for {self.csv_path}...")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data = pd.read_csv(self.csv_path, dtype=self.dtypes or None)
+        tmp_path = self.cache_path + ".tmp"
+        feather.write_feather(data, tmp_path, compression="uncompressed", chunksize=DEFAULT_CHUNK_SIZE)
+        os.replace(tmp_path, self.cache_path)
+        with open(self.meta_path, "w") as f:
+            json.dump(signature, f)
+
+    def _read_table(self, columns=None):
+        signature = self._csv_signature()
+        if not self._cache_is_fresh(signature):
+            self._rebuild_cache(signature)
+        # Memory-mapped: only the pages of the requested columns are actually read
+        return feather.read_table(self.cache_path, columns=columns, memory_map=True)
@@ -0,0 +1,204 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Scores the disease model on a labelled folder, by default the shipped "Plant Dataset/Test" split (one
+# sub-folder per class, named as in class_names.json). Prints the confusion matrix, per-class precision, recall and F1,
+# and for each --thresholds value how many photos the model answers with at least that confidence and how accurate
+# those answers are.
+# The model's output for every file is stored in cache/eval/, keyed by the file's content hash and
+# model_predict.disease_fingerprint() (model file, backend, input scaling, decoding). A second run, with other
+# thresholds or after a code change that does not touch the model, only hashes the files and re-scores the stored
+# outputs; only new or changed photos go through the model.
+# Usage: python evaluate.py [--folder "Plant Dataset/Test"] [--thresholds 0 0.5 0.8 0.95] [--json report.json]
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import model_predict
+from batch_predict import iter_image_paths
+from content_hash import file_digest
+
+DEFAULT_FOLDER = os.path.join(model_predict.BASE_DIR, "Plant Dataset", "Test")
+OUTPUTS_DIR = os.path.join(model_predict.BASE_DIR, "cache", "eval")
+DEFAULT_THRESHOLDS = (0.0, 0.5, 0.8, 0.95)
+KEEP_FINGERPRINTS = 5
+
+
+# 1. STORED MODEL OUTPUTS
+class OutputStore:
+    # One .npz file per model fingerprint holding the content hashes and the matching (N, num_classes) outputs.
+    def __init__(self, folder=OUTPUTS_DIR):
+        self.folder = folder
+
+    def path_for(self, fingerprint):
+        return os.path.join(self.folder, f"{fingerprint}.npz")
+
+    def load(self, fingerprint):
+        # Returns {content hash: output row}; empty if nothing is stored for this fingerprint
+        try:
+            with np.load(self.path_for(fingerprint)) as data:
+                return dict(zip(data["hashes"].tolist(), data["outputs"]))
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def save(self, fingerprint, outputs_by_hash):
+        if not outputs_by_hash:
+            return  # every file failed to load; nothing to store
+        os.makedirs(self.folder, exist_ok=True)
+        hashes = sorted(outputs_by_hash)
+        path = self.path_for(fingerprint)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, hashes=np.array(hashes, dtype="U64"),
+                     outputs=np.stack([outputs_by_hash[h] for h in hashes]).astype(np.float32))
+        os.replace(tmp_path, path)
+        self._prune(keep=path)
+
+    def _prune(self, keep):
+        # Only the outputs of the most recently used models are kept
+        files = sorted((os.path.join(self.folder, name) for name in os.listdir(self.folder) if name.endswith(".npz")),
+                       key=os.path.getmtime, reverse=True)
+        for path in files[KEEP_FINGERPRINTS:]:
+            if path != keep:
+                os.remove(path)
+
+
+def model_outputs(paths, store, batch_size=model_predict.DEFAULT_BATCH_SIZE):
+    # Returns (outputs (N, num_classes), errors, number of files that went through the model)
+    fingerprint = model_predict.disease_fingerprint()
+    stored = store.load(fingerprint)
+    hashes = [file_digest(path) for path in paths]
+    missing = [i for i, h in enumerate(hashes) if h not in stored]
+
+    errors = [None] * len(paths)
+    if missing:
+        probabilities, missing_errors = model_predict.predict_probabilities([paths[i] for i in missing], batch_size)
+        for i, row, error in zip(missing, probabilities, missing_errors):
+            if error is None:
+                stored[hashes[i]] = row
+            else:
+                errors[i] = error
+        store.save(fingerprint, stored)
+
+    num_classes = len(next(iter(stored.values()))) if stored else len(model_predict.get_class_names())
+    outputs = np.full((len(paths), num_classes), np.nan, dtype=np.float32)
+    for i, h in enumerate(hashes):
+        if h in stored:
+            outputs[i] = stored[h]
+    return outputs, errors, len(missing)
+
+
+# 2. SCORING
+def confusion_matrix(true_labels, predicted_labels, num_classes):
+    # Rows are the true class, columns the predicted class
+    return np.bincount(true_labels * num_classes + predicted_labels,
+                       minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+
+
+def per_class_scores(matrix):
+    # Returns (precision, recall, f1) arrays; a class that is never predicted (or never present) scores 0
+    hits = np.diag(matrix).astype(np.float64)
+    predicted = matrix.sum(axis=0)
+    actual = matrix.sum(axis=1)
+    precision = np.divide(hits, predicted, out=np.zeros_like(hits), where=predicted > 0)
+    recall = np.divide(hits, actual, out=np.zeros_like(hits), where=actual > 0)
+    both = precision + recall
+    f1 = np.divide(2 * precision * recall, both, out=np.zeros_like(hits), where=both > 0)
+    return precision, recall, f1
+
+
+def score(outputs, true_labels, num_classes, threshold=0.0):
+    # Scores the photos the model answers with a top probability of at least threshold
+    confidence = outputs.max(axis=1)
+    predicted = outputs.argmax(axis=1)
+    answered = confidence >= threshold
+    matrix = confusion_matrix(true_labels[answered], predicted[answered], num_classes)
+    precision, recall, f1 = per_class_scores(matrix)
+    return {
+        "threshold": threshold,
+        "coverage": float(answered.mean()) if len(answered) else 0.0,
+        "accuracy": float(np.trace(matrix) / max(matrix.sum(), 1)),
+        "macro_precision": float(precision.mean()),
+        "macro_recall": float(recall.mean()),
+        "confusion_matrix": matrix.tolist(),
+        "precision": precision.tolist(),
+        "recall": recall.tolist(),
+        "f1": f1.tolist(),
+    }
+
+
+# 3. LABELLED FILES
+def labelled_paths(folder, class_names):
+    # Returns (paths, class indexes) for every image in a sub-folder named after a class
+    paths, labels = [], []
+    for index, name in enumerate(class_names):
+        class_paths = list(iter_image_paths(os.path.join(folder, name)))
+        paths += class_paths
+        labels += [index] * len(class_paths)
+    return paths, np.array(labels, dtype=np.int64)
+
+
+def print_report(report, class_names):
+    width = max(12, max(len(name) for name in class_names) + 2)
+    print("\nConfusion matrix (rows: true class, columns: predicted class)")
+    print(" " * width + "".join(f"{name[:10]:>11}" for name in class_names))
+    for name, row in zip(class_names, report["confusion_matrix"]):
+        print(f"{name:<{width}}" + "".join(f"{count:>11}" for count in row))
+
+    print(f"\n{'class':<{width}}{'precision':>11}{'recall':>11}{'f1':>11}")
+    for name, p, r, f in zip(class_names, report["precision"], report["recall"], report["f1"]):
+        print(f"{name:<{width}}{p:>11.3f}{r:>11.3f}{f:>11.3f}")
+    print(f"Accuracy: {report['accuracy'] * 100:.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the disease model on a labelled test folder.")
+    parser.add_argument("--folder", default=DEFAULT_FOLDER, help="Folder with one sub-folder per class.")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=list(DEFAULT_THRESHOLDS),
+                        help="Confidence thresholds (0-1) to re-score at.")
+    parser.add_argument("--batch-size", type=int, default=model_predict.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--json", help="Also write the report to this JSON file.")
+    args = parser.parse_args()
+
+    class_names = model_predict.get_class_names()
+    paths, true_labels = labelled_paths(args.folder, class_names)
+    if not paths:
+        print(f"No images found in class folders under {args.folder}")
+        return 1
+
+    start = time.perf_counter()
+    outputs, errors, inferred = model_outputs(paths, OutputStore(), args.batch_size)
+    print(f"{len(paths)} images, {inferred} through the model, {len(paths) - inferred} from stored outputs "
+          f"({time.perf_counter() - start:.2f} s)")
+    failed = [(path, error) for path, error in zip(paths, errors) if error is not None]
+    for path, error in failed:
+        print(f"  skipped {path}: {error}")
+    ok = np.array([error is None for error in errors], dtype=bool)
+    outputs, true_labels = outputs[ok], true_labels[ok]
+
+    start = time.perf_counter()
+    reports = [score(outputs, true_labels, len(class_names), threshold) for threshold in args.thresholds]
+    scoring_ms = (time.perf_counter() - start) * 1000
+
+    print_report(score(outputs, true_labels, len(class_names)), class_names)
+    print(f"\n{'threshold':>10}{'coverage':>10}{'accuracy':>10}{'precision':>11}{'recall':>9}")
+    for r in reports:
+        print(f"{r['threshold']:>10.2f}{r['coverage'] * 100:>9.1f}%{r['accuracy'] * 100:>9.1f}%"
+              f"{r['macro_precision']:>11.3f}{r['macro_recall']:>9.3f}")
+    print(f"Scored {len(reports)} thresholds in {scoring_ms:.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"folder": args.folder, "class_names": class_names, "fingerprint":
+                       model_predict.disease_fingerprint(), "skipped": [p for p, _ in failed], "thresholds": reports},
+                      f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,21 +5,45 @@
 
 # gui_interface.py
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-from PIL import ImageTk, Image
+from tkinter import filedialog, messagebox, ttk
+from PIL import ImageTk
 import os
-import shutil
 import platform
 import subprocess
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from content_hash import file_digest
+from history_store import HistoryStore
+from image_store import ImageStore
+from thumbnail_cache import ThumbnailCache
 
-# Import both prediction functions
+# Import both prediction functions (models are loaded lazily, so this import is quick)
 try:
-    from model_predict import predict_image, check_if_plant
+    from model_predict import predict_image, check_if_plant, analyze_image, warm_up, models_ready, model_status
+    from model_registry import FAILED
 except ImportError:
     print("Warning: model_predict.py not found. Analysis will use dummy data.")
     predict_image = None
     check_if_plant = None
+    analyze_image = None
+    warm_up = None
+
+# Size of the preview shown on the right of the window
+PREVIEW_SIZE = (380, 380)
+# Entries per page in the history viewer
+HISTORY_PAGE_SIZE = 100
+ALL_CLASSES = "All classes"
+
+
+BACKGROUND_SIZE = (900, 650)
+
+# Previews and the background come from an on-disk thumbnail cache (see thumbnail_cache.py)
+thumbnails = ThumbnailCache()
+
+
+# Returns the image scaled for the preview, upright and undistorted. mode="cover" fills the whole box instead. Kept apart
+# from the Tk code so benchmark_suite.py can time it without a display.
+def load_preview_image(file_path, size=PREVIEW_SIZE, mode="fit"):
+    return thumbnails.get(file_path, size, mode)
 
 
 class PlantHealthApp:
@@ -30,13 +54,12 @@ class PlantHealthApp:
         self.root.resizable(False, False)
 
         # BACKGROUND CANVAS
-        self.canvas = tk.Canvas(root, width=900, height=650, highlightthickness=0)
+        self.canvas = tk.Canvas(root, width=BACKGROUND_SIZE[0], height=BACKGROUND_SIZE[1], highlightthickness=0)
         self.canvas.pack(fill="both", expand=True)
 
         # Load Background Image
         try:
-            self.bg_image = Image.open("background_fixed.jpg")
-            self.bg_image = self.bg_image.resize((900, 650))
+            self.bg_image = load_preview_image("background_fixed.jpg", BACKGROUND_SIZE, mode="cover")
             self.bg_photo = ImageTk.PhotoImage(self.bg_image)
             self.canvas.create_image(0, 0, image=self.bg_photo, anchor="nw")
         except FileNotFoundError:
@@ -102,9 +125,24 @@ class PlantHealthApp:
         self.canvas.create_window(center_x, 380, window=self.btn_reset)
 
         # 7. Exit
-        self.btn_exit = tk.Button(root, text="Exit", command=root.quit, width=button_width)
+        self.btn_exit = tk.Button(root, text="Exit", command=self.on_close, width=button_width)
         self.canvas.create_window(center_x, 430, window=self.btn_exit)
 
+        # Model loading status (models warm up in the background after the window is shown)
+        self.status_text = self.canvas.create_text(
+            center_x, 480,
+            text="",
+            font=("Arial", 9, "italic"),
+            fill="black",
+            anchor="center"
+        )
+
+        # Analysis progress (hidden until an analysis is running)
+        self.progress = ttk.Progressbar(root, mode="indeterminate", length=180)
+        self.progress_window = self.canvas.create_window(center_x, 510, window=self.progress, state="hidden")
+        self.btn_cancel = tk.Button(root, text="Cancel Analysis", command=self.cancel_analysis, width=button_width)
+        self.cancel_window = self.canvas.create_window(center_x, 545, window=self.btn_cancel, state="hidden")
+
         # RIGHT SIDE (Image Preview) 
         self.right_frame = tk.Frame(root, bg="white", highlightthickness=2, bd=2, relief="groove")
         self.right_frame.place(x=450, y=50, width=400, height=400)
@@ -114,8 +152,45 @@ class PlantHealthApp:
 
         self.selected_image_path = None
         self.displayed_image = None
+        # History lives in an SQLite file; entries from the old text log are imported into it at start-up
         self.history_file = "history_log.txt"
+        self.history = HistoryStore("history.sqlite3")
         self.save_folder = "saved_images"
+        # Each photo is stored once (by content hash); the files in the folder are copies the user is free to edit
+        self.image_store = ImageStore(self.save_folder)
+
+        # Analysis runs on one worker thread so the window keeps responding. Every request gets an id; a result is only
+        # shown if its id is still the current one, so cancelled or superseded requests are simply dropped.
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+        self.analysis_id = 0
+        self.analysis_future = None
+        self.closing = False
+
+        # Pending history entries are written when the window closes
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(200, self.import_legacy_history)
+
+        # Let Tk paint the window first, then start loading the models
+        if warm_up is not None:
+            self.canvas.itemconfig(self.status_text, text="Loading models...")
+            self.root.after(100, self.start_model_warm_up)
+
+    def start_model_warm_up(self):
+        warm_up(background=True)
+        self.poll_model_status()
+
+    def poll_model_status(self):
+        # Checks the background loading every 250 ms without blocking the Tk main loop.
+        if self.closing:
+            return
+        if not models_ready():
+            self.root.after(250, self.poll_model_status)
+            return
+        failed = [name for name, status in model_status().items() if status == FAILED]
+        if failed:
+            self.canvas.itemconfig(self.status_text, text=f"Could not load: {', '.join(failed)}")
+        else:
+            self.canvas.itemconfig(self.status_text, text="Models ready")
 
     def select_image(self):
         file_path = filedialog.askopenfilename(
@@ -123,13 +198,15 @@ class PlantHealthApp:
             filetypes=[("Image Files", "*.jpg *.png *.jpeg")]
         )
         if file_path:
+            # A new image makes any running analysis stale
+            if self.analysis_future is not None:
+                self.cancel_analysis(quiet=True)
             self.selected_image_path = file_path
             self.show_image_on_right(file_path)
 
     def show_image_on_right(self, file_path):
         try:
-            img = Image.open(file_path)
-            img = img.resize((380, 380))
+            img = load_preview_image(file_path)
             self.displayed_image = ImageTk.PhotoImage(img)
             self.image_label.config(image=self.displayed_image, text="")
         except Exception as e:
@@ -140,31 +217,49 @@ class PlantHealthApp:
             messagebox.showwarning("Warning", "No image selected to save.")
             return
 
-        if not os.path.exists(self.save_folder):
-            os.makedirs(self.save_folder)
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        original_ext = os.path.splitext(self.selected_image_path)[1]
-        new_filename = f"plant_{timestamp}{original_ext}"
-        destination_path = os.path.join(self.save_folder, new_filename)
-
         try:
-            shutil.copy(self.selected_image_path, destination_path)
-            messagebox.showinfo("Success", f"Image saved successfully to '{self.save_folder}'.")
+            saved_path, is_new = self.image_store.save(self.selected_image_path)
+            if is_new:
+                messagebox.showinfo("Success", f"Image saved successfully to '{self.save_folder}'.")
+            else:
+                messagebox.showinfo("Already Saved", f"This photo is already saved as '{os.path.basename(saved_path)}'.")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save image: {e}")
 
-    def save_to_history(self, plant_class, confidence):
+    def save_to_history(self, plant_class, confidence, image_path=None, detected_label=None, is_plant=None):
         try:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            filename = os.path.basename(self.selected_image_path)
-            log_entry = f"[{timestamp}] File: {filename} | Result: {plant_class} ({confidence:.2f}%)\n"
-
-            with open(self.history_file, "a") as f:
-                f.write(log_entry)
+            image_path = image_path or self.selected_image_path
+            self.history.add(
+                plant_class, confidence,
+                file_name=os.path.basename(image_path),
+                file_hash=file_digest(image_path) if os.path.exists(image_path) else None,
+                gatekeeper_label=detected_label,
+                is_plant=is_plant,
+            )
+            # Writes are batched; make sure this one reaches the disk soon even if no other analysis follows
+            self.root.after(5000, self.history.flush)
         except Exception as e:
             print(f"Error saving history: {e}")
 
+    def import_legacy_history(self):
+        try:
+            imported = self.history.import_legacy_log(self.history_file)
+            if imported:
+                print(f"Imported {imported} entries from {self.history_file}.")
+        except Exception as e:
+            print(f"Error importing {self.history_file}: {e}")
+
+    def on_close(self):
+        # Stop the polling loops and drop any analysis first, so nothing runs against the destroyed window and a
+        # running analysis does not keep the program alive (it stops at its next stage)
+        self.closing = True
+        self.analysis_id += 1
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            self.history.close()
+        finally:
+            self.root.destroy()
+
     def get_plant_type(self, full_class_name):
         if "___" in full_class_name:
             return full_class_name.split("___")[0]
@@ -265,34 +360,77 @@ class PlantHealthApp:
             messagebox.showwarning("Warning", "Please select an image first.")
             return
 
-        # Plant Photo Checker
-        if check_if_plant:
-            # Note: Now expecting TWO return values (is_plant, label)
-            is_plant, detected_label = check_if_plant(self.selected_image_path)
-
-            if not is_plant:
-                # Ask the user if they want to proceed anyway
-                response = messagebox.askyesno(
-                    "Unusual Image Detected",
-                    f"The system thinks this looks like: '{detected_label}'\n"
-                    "It might not be a plant.\n\n"
-                    "Do you want to analyze it anyway?"
-                )
-                if not response:  # If user clicks 'No', stop.
-                    return
-
-        # PERFORM ANALYSIS
-        if predict_image is None:
-            plant_class = "Demo: Apple___Black_rot"
-            confidence = 88.5
+        if analyze_image is None:
+            self.show_analysis_results(self.selected_image_path, (True, "Demo", "Demo: Apple___Black_rot", 88.5))
+            return
+
+        # PERFORM ANALYSIS on the worker thread (the image is decoded once for both the plant checker and the disease
+        # model), then poll for the result from the Tk main loop
+        self.analysis_id += 1
+        request_id = self.analysis_id
+        image_path = self.selected_image_path
+        # A superseded request stops before its next decode or model pass instead of holding up the only worker
+        self.analysis_future = self.executor.submit(analyze_image, image_path,
+                                                    cancelled=lambda: request_id != self.analysis_id)
+        self.set_busy(True)
+        self.root.after(50, self.poll_analysis, request_id, image_path, self.analysis_future)
+
+    def poll_analysis(self, request_id, image_path, future):
+        if self.closing or request_id != self.analysis_id:
+            return  # window closed, or cancelled or superseded by a newer request
+        if not future.done():
+            self.root.after(50, self.poll_analysis, request_id, image_path, future)
+            return
+
+        self.analysis_future = None
+        self.set_busy(False)
+        try:
+            result = future.result()
+        except Exception as e:
+            messagebox.showerror("Prediction Error", str(e))
+            return
+        self.show_analysis_results(image_path, result)
+
+    def cancel_analysis(self, quiet=False):
+        # The model call itself cannot be interrupted, but bumping the id means its result is ignored
+        self.analysis_id += 1
+        if self.analysis_future is not None:
+            self.analysis_future.cancel()
+            self.analysis_future = None
+        self.set_busy(False)
+        if not quiet:
+            self.canvas.itemconfig(self.status_text, text="Analysis cancelled")
+
+    def set_busy(self, busy):
+        state = "disabled" if busy else "normal"
+        self.btn_analyze.config(state=state)
+        self.btn_save.config(state=state)
+        window_state = "normal" if busy else "hidden"
+        self.canvas.itemconfigure(self.progress_window, state=window_state)
+        self.canvas.itemconfigure(self.cancel_window, state=window_state)
+        if busy:
+            self.progress.start(15)
+            self.canvas.itemconfig(self.status_text, text="Analyzing...")
         else:
-            try:
-                plant_class, confidence = predict_image(self.selected_image_path)
-            except Exception as e:
-                messagebox.showerror("Prediction Error", str(e))
+            self.progress.stop()
+            self.canvas.itemconfig(self.status_text, text="")
+
+    def show_analysis_results(self, image_path, result):
+        is_plant, detected_label, plant_class, confidence = result
+
+        # Plant Photo Checker
+        if not is_plant:
+            # Ask the user if they want to proceed anyway
+            response = messagebox.askyesno(
+                "Unusual Image Detected",
+                f"The system thinks this looks like: '{detected_label}'\n"
+                "It might not be a plant.\n\n"
+                "Do you want to analyze it anyway?"
+            )
+            if not response:  # If user clicks 'No', stop.
                 return
 
-        self.save_to_history(plant_class, confidence)
+        self.save_to_history(plant_class, confidence, image_path, detected_label, is_plant)
 
         # 1. Get Clean Data
         plant_name = self.get_plant_type(plant_class)
@@ -330,23 +468,79 @@ class PlantHealthApp:
         tk.Button(results_window, text="Close", command=results_window.destroy).pack(pady=10)
 
     def view_history_popup(self):
+        # Shows one page of the history at a time, so opening it stays quick however long the history gets
         history_win = tk.Toplevel(self.root)
         history_win.title("Analysis History")
-        history_win.geometry("700x400")
+        history_win.geometry("760x460")
 
         tk.Label(history_win, text="History Log", font=("Arial", 14, "bold")).pack(pady=10)
 
-        text_area = scrolledtext.ScrolledText(history_win, width=80, height=15, font=("Consolas", 9))
-        text_area.pack(padx=10, pady=10)
-
-        if os.path.exists(self.history_file):
-            with open(self.history_file, "r") as f:
-                content = f.read()
-                text_area.insert(tk.END, content)
-        else:
-            text_area.insert(tk.END, "No history found yet.")
-
-        text_area.config(state=tk.DISABLED)
+        # Filters
+        filter_frame = tk.Frame(history_win)
+        filter_frame.pack(fill="x", padx=10)
+        class_var = tk.StringVar(value=ALL_CLASSES)
+        from_var = tk.StringVar()
+        to_var = tk.StringVar()
+        tk.Label(filter_frame, text="Class:").pack(side="left")
+        ttk.Combobox(filter_frame, textvariable=class_var, values=[ALL_CLASSES] + self.history.classes(),
+                     state="readonly", width=24).pack(side="left", padx=5)
+        tk.Label(filter_frame, text="From (YYYY-MM-DD):").pack(side="left")
+        tk.Entry(filter_frame, textvariable=from_var, width=11).pack(side="left", padx=5)
+        tk.Label(filter_frame, text="To:").pack(side="left")
+        tk.Entry(filter_frame, textvariable=to_var, width=11).pack(side="left", padx=5)
+        tk.Button(filter_frame, text="Apply", command=lambda: show_page(0)).pack(side="left", padx=5)
+
+        # Table
+        table_frame = tk.Frame(history_win)
+        table_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        columns = {"timestamp": ("Time", 140), "file_name": ("File", 180), "plant_class": ("Result", 170),
+                   "confidence": ("Confidence", 80), "gatekeeper_label": ("Looks like", 130)}
+        tree = ttk.Treeview(table_frame, columns=list(columns), show="headings")
+        for name, (heading, width) in columns.items():
+            tree.heading(name, text=heading)
+            tree.column(name, width=width, anchor="w")
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        # Pager
+        pager = tk.Frame(history_win)
+        pager.pack(pady=(0, 5))
+        page = {"number": 0}
+        prev_button = tk.Button(pager, text="< Prev", command=lambda: show_page(page["number"] - 1))
+        page_label = tk.Label(pager, width=32)
+        next_button = tk.Button(pager, text="Next >", command=lambda: show_page(page["number"] + 1))
+        prev_button.pack(side="left")
+        page_label.pack(side="left", padx=10)
+        next_button.pack(side="left")
+
+        def show_page(number):
+            filters = {
+                "plant_class": None if class_var.get() == ALL_CLASSES else class_var.get(),
+                "date_from": from_var.get().strip() or None,
+                "date_to": to_var.get().strip() or None,
+            }
+            try:
+                total = self.history.count(**filters)
+            except ValueError:
+                messagebox.showerror("Invalid Date", "Dates must look like 2025-03-01.", parent=history_win)
+                return
+            pages = max(1, -(-total // HISTORY_PAGE_SIZE))
+            number = min(max(number, 0), pages - 1)
+            rows = self.history.query(**filters, limit=HISTORY_PAGE_SIZE, offset=number * HISTORY_PAGE_SIZE)
+
+            tree.delete(*tree.get_children())
+            for row in rows:
+                tree.insert("", tk.END, values=(row["timestamp"], row["file_name"] or "", row["plant_class"],
+                                                f"{row['confidence']:.2f}%", row["gatekeeper_label"] or ""))
+            page["number"] = number
+            page_label.config(text=f"Page {number + 1} of {pages} ({total} entries)" if total
+                              else "No history found yet.")
+            prev_button.config(state="normal" if number > 0 else "disabled")
+            next_button.config(state="normal" if number < pages - 1 else "disabled")
+
+        show_page(0)
         tk.Button(history_win, text="Close", command=history_win.destroy).pack(pady=5)
 
     def open_saved_images_folder(self):
@@ -367,6 +561,8 @@ class PlantHealthApp:
             messagebox.showerror("Error", f"Could not open path: {e}")
 
     def reset_selection(self):
+        if self.analysis_future is not None:
+            self.cancel_analysis(quiet=True)
         self.selected_image_path = None
         self.image_label.config(image="", text="Preview Area")
 
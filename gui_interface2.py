@@ -9,9 +9,11 @@ class PlantHealthApp:
         self.root.title("Group 7: Plant Health Checker")
         self.root.geometry("500x400")
 
-        # We load data immediately so the user doesn't have to click a button
+        # We start loading the data immediately so the user doesn't have to click a button. It loads on a background
+        # thread (from the columnar cache after the first run), so the window opens straight away; check
+        # self.data_manager.loaded before using the data.
         self.data_manager = PlantDataManager('data/plants_dataset.csv')
-        self.data_manager.load_dataset()
+        self.data_manager.load_in_background()
         self.selected_image_path = None
 
         # Title
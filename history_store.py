@@ -0,0 +1,160 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Analysis history in a local SQLite file instead of the flat history_log.txt. Each entry has structured
+# fields (timestamp, file name, file hash, class, confidence, gatekeeper label) with indexes on time, class and hash,
+# so the history viewer can show one page at a time filtered by class or date however long the kiosk has been running.
+# New entries are written in batches. Old history_log.txt files can be imported, and re-importing only picks up lines
+# added since the last import.
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+COLUMNS = ("id", "timestamp", "file_name", "file_hash", "plant_class", "confidence", "gatekeeper_label", "is_plant")
+
+# One line of the old text log, e.g. "[2025-03-01 14:02:11] File: leaf.jpg | Result: Rust (97.12%)"
+LEGACY_LINE = re.compile(r"^\[(?P<timestamp>[^\]]+)\] File: (?P<file_name>.*) \| Result: (?P<plant_class>.*) "
+                         r"\((?P<confidence>[-\d.]+)%\)\s*$")
+
+
+class HistoryStore:
+    def __init__(self, db_path, batch_size=20, flush_interval=5.0):
+        self.db_path = db_path
+        # Pending entries are written when there are batch_size of them, when the oldest has waited flush_interval
+        # seconds, before any query, and on close().
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._pending = []
+        self._pending_since = None
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, file_name TEXT, file_hash TEXT,"
+            " plant_class TEXT, confidence REAL, gatekeeper_label TEXT, is_plant INTEGER);"
+            "CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp);"
+            "CREATE INDEX IF NOT EXISTS history_class ON history (plant_class, timestamp);"
+            "CREATE INDEX IF NOT EXISTS history_hash ON history (file_hash);"
+            # Bytes of each legacy log already imported
+            "CREATE TABLE IF NOT EXISTS imported_logs (path TEXT PRIMARY KEY, offset INTEGER NOT NULL);"
+        )
+        self._conn.commit()
+
+    # 1. WRITING
+    def add(self, plant_class, confidence, file_name=None, file_hash=None, gatekeeper_label=None, is_plant=None,
+            timestamp=None):
+        timestamp = timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)
+        row = (timestamp, file_name, file_hash, plant_class, float(confidence), gatekeeper_label,
+               None if is_plant is None else int(bool(is_plant)))
+        with self._lock:
+            self._pending.append(row)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._pending_since >= self.flush_interval):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO history (timestamp, file_name, file_hash, plant_class, confidence, gatekeeper_label,"
+                " is_plant) VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending
+            )
+        self._pending = []
+        self._pending_since = None
+
+    # 2. READING
+    @staticmethod
+    def _where(plant_class=None, date_from=None, date_to=None):
+        # Dates are "YYYY-MM-DD" strings; date_to includes that whole day
+        clauses, params = [], []
+        if plant_class:
+            clauses.append("plant_class = ?")
+            params.append(plant_class)
+        if date_from:
+            clauses.append("timestamp >= ?")
+            params.append(datetime.strptime(date_from, "%Y-%m-%d").strftime(TIMESTAMP_FORMAT))
+        if date_to:
+            clauses.append("timestamp < ?")
+            day_after = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1)
+            params.append(day_after.strftime(TIMESTAMP_FORMAT))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    # Returns one page of entries as dicts, newest first.
+    def query(self, plant_class=None, date_from=None, date_to=None, limit=100, offset=0):
+        where, params = self._where(plant_class, date_from, date_to)
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM history{where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def count(self, plant_class=None, date_from=None, date_to=None):
+        where, params = self._where(plant_class, date_from, date_to)
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(f"SELECT COUNT(*) FROM history{where}", params).fetchone()[0]
+
+    def classes(self):
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(
+                "SELECT DISTINCT plant_class FROM history WHERE plant_class IS NOT NULL ORDER BY plant_class"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # 3. LEGACY IMPORT
+    # Imports the lines of an old history_log.txt that have not been imported yet. Returns how many were added.
+    # Lines that do not match the old format are skipped.
+    def import_legacy_log(self, log_path):
+        if not os.path.exists(log_path):
+            return 0
+        key = os.path.abspath(log_path)
+        with self._lock:
+            self._flush_locked()
+            row = self._conn.execute("SELECT offset FROM imported_logs WHERE path = ?", (key,)).fetchone()
+            offset = row[0] if row else 0
+            if offset > os.path.getsize(log_path):
+                offset = 0  # the log was replaced by a shorter file
+
+            entries = []
+            with open(log_path, "rb") as f:
+                f.seek(offset)
+                for raw_line in f:
+                    if not raw_line.endswith(b"\n"):
+                        break  # a line still being written; pick it up next time
+                    offset += len(raw_line)
+                    match = LEGACY_LINE.match(raw_line.decode("utf-8", errors="replace"))
+                    if match:
+                        entries.append((match["timestamp"], match["file_name"], None, match["plant_class"],
+                                        float(match["confidence"]), None, None))
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO history (timestamp, file_name, file_hash, plant_class, confidence, gatekeeper_label,"
+                    " is_plant) VALUES (?, ?, ?, ?, ?, ?, ?)", entries
+                )
+                self._conn.execute("INSERT OR REPLACE INTO imported_logs (path, offset) VALUES (?, ?)", (key, offset))
+        return len(entries)
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
@@ -1,92 +1,336 @@
 # Project: Plant Health Checker
 # Students: Smit Desai, Faith Akinlade, Pratham Waghela (Group 7)
-# Description: Downloads (or loads) the Plant Dataset, extracts it if zipped, and prepares Train, Test, and Validation
-# image datasets for CNN training. Normalizes images and prefetches them for efficient processing.
+# Description: Prepares Train, Test, and Validation image datasets for CNN training. Normalizes images and prefetches
+# them for efficient processing.
+# Importing this file is instant: nothing is read until build_datasets() is called, or until one of the old
+# module-level names (train_ds, val_ds, test_ds, class_names, train_count, val_count) is first used, which builds the
+# default source once.
+# Sources (PLANT_DATA_SOURCE environment variable, or build_datasets(source=...)):
+#   "zip"        stream PlantVillage.zip without extracting it (default)
+#   "extract"    unpack PlantVillage.zip into data_cache once and read the folders (the original behaviour)
+#   "shipped"    the small "Plant Dataset/Train|Validation|Test" folders that come with the project
+#   "synthetic"  a tiny generated in-memory set, no files needed (for tests and quick checks)
 
-import tensorflow as tf
+import glob
+import hashlib
 import os
+import sys
+import threading
+import time
 import zipfile
 
-%%writefile image_preprocessing_file.py
-
-# 1. AUTO-EXTRACTION 
+# 1. SETTINGS
 ZIP_FILENAME = "PlantVillage.zip"
 EXTRACT_FOLDER = "data_cache"  # We extract into this folder
+SHIPPED_FOLDER = "Plant Dataset"
+
+SOURCES = ("zip", "extract", "shipped", "synthetic")
+DATA_SOURCE = os.environ.get("PLANT_DATA_SOURCE", "zip")
 
-# Check if the zip file actually exists in the project folder
-if not os.path.exists(ZIP_FILENAME):
-    print(f"ERROR: '{ZIP_FILENAME}' not found!")
-    print("   Please put the PlantVillage.zip file in the same folder as this script.")
-    raise FileNotFoundError("Zip file missing.")
+IMG_SIZE = (224, 224)
+BATCH_SIZE = 32
+SEED = 123
+# Models are trained on pixels multiplied by this ([0, 1]); model_predict scales its inputs the same way
+INPUT_SCALE = 1.0 / 255.0
 
-# Extract only if we haven't already 
-if not os.path.exists(EXTRACT_FOLDER):
-    print(f"Extracting {ZIP_FILENAME}... (This may take a while!!)")
-    with zipfile.ZipFile(ZIP_FILENAME, "r") as zip_ref:
-        zip_ref.extractall(EXTRACT_FOLDER)
-    print("Extraction Complete!")
-else:
-    print("Data already extracted. Using existing folder.")
+# Pipeline mode: "auto" caches the decoded images in RAM after the first epoch when all splits fit in
+# PIPELINE_MEMORY_MB and in files under cache/pipeline/ otherwise, "memory" always uses RAM, "none" re-reads the JPEGs
+# every epoch, anything else is used as a file prefix for an on-disk cache. On-disk caches are named after a fingerprint
+# of the split's files (paths, sizes, modification times), so adding, removing, editing or moving an image to another
+# class folder builds a new cache instead of training on stale images; the old one is deleted.
+# Memory cost: cached images are uint8, 224 * 224 * 3 = 147 KB each, so the ~54,000 PlantVillage photos need about
+# 8 GB in RAM. "auto" keeps them on disk; the shipped and synthetic sets fit the default budget and stay in memory.
+PIPELINE_CACHE = os.environ.get("PLANT_PIPELINE_CACHE", "auto")
+PIPELINE_MEMORY_MB = float(os.environ.get("PLANT_PIPELINE_MEMORY_MB", "2048"))
+PIPELINE_CACHE_DIR = os.path.join("cache", "pipeline")
+# RAM for the training shuffle buffer, which also holds uint8 images: 512 MB is about 3,500 images at 224x224 (a fixed
+# 20,000-image buffer took about 3 GB). Smaller training sets are shuffled whole every epoch.
+SHUFFLE_MEMORY_MB = float(os.environ.get("PLANT_SHUFFLE_MEMORY_MB", "512"))
 
+# The synthetic source: a few flat-coloured noisy images per class, different enough for a model to learn
+SYNTHETIC_CLASSES = ["Healthy", "Powdery", "Rust"]
+SYNTHETIC_IMAGES_PER_CLASS = 8
 
-# 2. DEFINE PATHS
-dataset_dir = os.path.join(EXTRACT_FOLDER, "PlantVillage")
 
-# If the zip structure is different (e.g. direct files), adjust this:
-if not os.path.exists(dataset_dir):
-    # Fallback: maybe the zip extracted directly to data_cache?
-    dataset_dir = EXTRACT_FOLDER
+class PlantDatasets:
+    # What build_datasets() returns. train_ds, val_ds and test_ds yield (float32 images in [0, 1], one-hot labels).
+    def __init__(self, source, train_ds, val_ds, test_ds, class_names, train_count, val_count, test_count):
+        self.source = source
+        self.train_ds = train_ds
+        self.val_ds = val_ds
+        self.test_ds = test_ds
+        self.class_names = class_names
+        self.train_count = train_count
+        self.val_count = val_count
+        self.test_count = test_count
 
-train_dir_path = os.path.join(dataset_dir, "train")
-val_dir_path = os.path.join(dataset_dir, "val")
 
-# Safety Check
-if not os.path.exists(train_dir_path):
-    print(f"CRITICAL ERROR: Could not find 'train' folder at: {train_dir_path}")
-    print("   Check your zip file structure.")
-    raise FileNotFoundError("Train folder missing.")
+# 2. RAW DATASETS (batched float32 images in 0-255 with .class_names and .file_paths, like
+# image_dataset_from_directory). Each loader returns (train, validation, test); test is None when the source has no
+# separate test split, in which case the validation split is used as the test set.
+def _require_zip():
+    # Check if the zip file actually exists in the project folder
+    if not os.path.exists(ZIP_FILENAME):
+        print(f"ERROR: '{ZIP_FILENAME}' not found!")
+        print("   Please put the PlantVillage.zip file in the same folder as this script.")
+        raise FileNotFoundError("Zip file missing.")
 
 
-# 3. LOAD DATASETS
-IMG_SIZE = (224, 224)
-BATCH_SIZE = 32
+def _directory_dataset(path, img_size, batch_size, class_names=None):
+    import tensorflow as tf
+    return tf.keras.preprocessing.image_dataset_from_directory(
+        path,
+        image_size=img_size,
+        batch_size=batch_size,
+        label_mode="categorical",
+        class_names=class_names,
+        seed=SEED
+    )
+
+
+def _load_zip(img_size, batch_size):
+    from zip_dataset import ZipImageIndex
+    _require_zip()
+
+    # Index the zip (no extraction)
+    print(f"Indexing {ZIP_FILENAME}...")
+    zip_index = ZipImageIndex(ZIP_FILENAME)
+
+    print("Loading Training Data...")
+    train_raw = zip_index.dataset("train", img_size, batch_size, label_mode="categorical", seed=SEED)
+    print(f"Found {len(train_raw.file_paths)} files belonging to {len(train_raw.class_names)} classes.")
+
+    print("Loading Validation Data...")
+    val_raw = zip_index.dataset("val", img_size, batch_size, label_mode="categorical", seed=SEED,
+                                class_names=train_raw.class_names)
+    print(f"Found {len(val_raw.file_paths)} files belonging to {len(val_raw.class_names)} classes.")
+    return train_raw, val_raw, None
+
+
+def _load_extracted(img_size, batch_size):
+    # Extract only if we haven't already
+    if not os.path.exists(EXTRACT_FOLDER):
+        _require_zip()
+        print(f"Extracting {ZIP_FILENAME}... (This may take a while!!)")
+        with zipfile.ZipFile(ZIP_FILENAME, "r") as zip_ref:
+            zip_ref.extractall(EXTRACT_FOLDER)
+        print("Extraction Complete!")
+    else:
+        print("Data already extracted. Using existing folder.")
+
+    dataset_dir = os.path.join(EXTRACT_FOLDER, "PlantVillage")
+    # If the zip structure is different (e.g. direct files), adjust this:
+    if not os.path.exists(dataset_dir):
+        # Fallback: maybe the zip extracted directly to data_cache?
+        dataset_dir = EXTRACT_FOLDER
+
+    train_dir_path = os.path.join(dataset_dir, "train")
+    val_dir_path = os.path.join(dataset_dir, "val")
+
+    # Safety Check
+    if not os.path.exists(train_dir_path):
+        print(f"CRITICAL ERROR: Could not find 'train' folder at: {train_dir_path}")
+        print("   Check your zip file structure.")
+        raise FileNotFoundError("Train folder missing.")
+
+    print("Loading Training Data...")
+    train_raw = _directory_dataset(train_dir_path, img_size, batch_size)
+    print("Loading Validation Data...")
+    val_raw = _directory_dataset(val_dir_path, img_size, batch_size, class_names=train_raw.class_names)
+    return train_raw, val_raw, None
+
+
+def _load_shipped(img_size, batch_size):
+    splits = [os.path.join(SHIPPED_FOLDER, name) for name in ("Train", "Validation", "Test")]
+    for path in splits:
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"'{path}' folder missing.")
+
+    print(f"Loading {SHIPPED_FOLDER}...")
+    train_raw = _directory_dataset(splits[0], img_size, batch_size)
+    val_raw = _directory_dataset(splits[1], img_size, batch_size, class_names=train_raw.class_names)
+    test_raw = _directory_dataset(splits[2], img_size, batch_size, class_names=train_raw.class_names)
+    return train_raw, val_raw, test_raw
+
 
-print("Loading Training Data...")
-train_ds_raw = tf.keras.preprocessing.image_dataset_from_directory(
-    train_dir_path,
-    image_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    label_mode="categorical",
-    seed=123
-)
+def _load_synthetic(img_size, batch_size):
+    import numpy as np
+    import tensorflow as tf
 
-print("Loading Validation Data...")
-val_ds_raw = tf.keras.preprocessing.image_dataset_from_directory(
-    val_dir_path,
-    image_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    label_mode="categorical",
-    seed=123
-)
+    def make_split(seed):
+        rng = np.random.default_rng(seed)
+        num_classes = len(SYNTHETIC_CLASSES)
+        labels = np.repeat(np.arange(num_classes), SYNTHETIC_IMAGES_PER_CLASS)
+        # One base colour per class plus noise
+        colours = np.linspace(40, 215, num_classes, dtype=np.float32)[labels]
+        images = colours[:, None, None, None] + rng.normal(0, 20, (len(labels), img_size[0], img_size[1], 3))
+        images = np.clip(images, 0, 255).astype(np.float32)
+        ds = tf.data.Dataset.from_tensor_slices((images, np.eye(num_classes, dtype=np.float32)[labels]))
+        ds = ds.shuffle(len(labels), seed=seed).batch(batch_size)
+        ds.class_names = list(SYNTHETIC_CLASSES)
+        ds.file_paths = [f"synthetic/{SYNTHETIC_CLASSES[label]}/{i}.png" for i, label in enumerate(labels)]
+        return ds
 
-# Use Validation as Test set
-test_ds_raw = val_ds_raw
+    return make_split(SEED), make_split(SEED + 1), make_split(SEED + 2)
 
 
-# 4. NORMALIZE & OPTIMIZE
-AUTOTUNE = tf.data.AUTOTUNE
+_LOADERS = {
+    "zip": _load_zip,
+    "extract": _load_extracted,
+    "shipped": _load_shipped,
+    "synthetic": _load_synthetic,
+}
 
+
+# 3. NORMALIZE & OPTIMIZE
 def preprocess(image, label):
-    return image / 255.0, label
+    return image * INPUT_SCALE, label
+
+def to_uint8(image, label):
+    import tensorflow as tf
+    # Cached images are stored as uint8, a quarter of the float32 size (the resize leaves fractions, so round first)
+    return tf.cast(tf.round(image), tf.uint8), label
+
+def normalize_uint8(image, label):
+    import tensorflow as tf
+    return preprocess(tf.cast(image, tf.float32), label)
+
+def image_bytes(img_size):
+    # Size of one cached uint8 image
+    return img_size[0] * img_size[1] * 3
+
+def cache_mode(num_images, img_size=IMG_SIZE):
+    # Resolves "auto" for a dataset of num_images: "memory" if it fits in PIPELINE_MEMORY_MB, a file prefix otherwise
+    if PIPELINE_CACHE != "auto":
+        return PIPELINE_CACHE
+    if num_images * image_bytes(img_size) <= PIPELINE_MEMORY_MB * 2 ** 20:
+        return "memory"
+    return os.path.join(PIPELINE_CACHE_DIR, f"{img_size[0]}x{img_size[1]}")
+
+def shuffle_buffer_size(num_images, img_size=IMG_SIZE):
+    return max(1, min(num_images, int(SHUFFLE_MEMORY_MB * 2 ** 20 // image_bytes(img_size))))
+
+def _stat_signature(path, memo):
+    # (size, mtime) of the file, or for a member of a zip (".../PlantVillage.zip/train/Rust/a.jpg") of the zip itself
+    if path not in memo:
+        try:
+            stat = os.stat(path)
+            memo[path] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            parent = os.path.dirname(path)
+            memo[path] = _stat_signature(parent, memo) if parent and parent != path else None
+    return memo[path]
+
+def source_fingerprint(file_paths, class_names=()):
+    # Changes whenever an image is added, removed, rewritten or moved to another class folder
+    sha = hashlib.sha256()
+    memo = {}
+    for name in class_names:
+        sha.update(f"{name}\n".encode())
+    for path in sorted(file_paths):
+        sha.update(f"{path}\0{_stat_signature(path, memo)}\n".encode())
+    return sha.hexdigest()[:16]
+
+def cache_split(ds, name, mode=None, fingerprint=None):
+    mode = mode or PIPELINE_CACHE
+    if mode == "none":
+        return ds
+    if mode == "memory":
+        return ds.cache()
+    if os.path.dirname(mode):
+        os.makedirs(os.path.dirname(mode), exist_ok=True)
+    prefix = f"{mode}_{name}_{fingerprint}" if fingerprint else f"{mode}_{name}"
+    # Caches of this split built from an older version of the files are never read again
+    for path in glob.glob(glob.escape(f"{mode}_{name}_") + "*"):
+        if not path.startswith(prefix + "."):
+            os.remove(path)
+    return ds.cache(prefix)
+
+def optimize(ds_raw, name, num_images, batch_size=BATCH_SIZE, shuffle=False, img_size=IMG_SIZE, mode=None):
+    import tensorflow as tf
+    AUTOTUNE = tf.data.AUTOTUNE
+    mode = mode or cache_mode(num_images, img_size)
+    fingerprint = None
+    if mode not in ("none", "memory"):
+        fingerprint = source_fingerprint(getattr(ds_raw, "file_paths", []), getattr(ds_raw, "class_names", []))
+    # Decode + resize happen once: the uint8 images are cached after the first pass, later epochs read the cache.
+    # Single images are cached and batched afterwards, so a cache does not depend on the batch size.
+    ds = ds_raw.map(to_uint8, num_parallel_calls=AUTOTUNE).unbatch()
+    ds = cache_split(ds, name, mode, fingerprint)
+    if shuffle:
+        # Shuffle single images (not whole batches) with a buffer that fits SHUFFLE_MEMORY_MB
+        ds = ds.shuffle(shuffle_buffer_size(num_images, img_size), reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size, num_parallel_calls=AUTOTUNE)
+    return ds.map(normalize_uint8, num_parallel_calls=AUTOTUNE).prefetch(AUTOTUNE)
+
+def measure_throughput(ds, num_epochs=2):
+    # Iterates the dataset on its own (no model) and reports wall time and images/s per epoch. If training runs much
+    # slower than this, the trainer is not input-bound.
+    results = []
+    for epoch in range(num_epochs):
+        start = time.perf_counter()
+        count = 0
+        for images, _ in ds:
+            count += int(images.shape[0])
+        elapsed = time.perf_counter() - start
+        results.append((elapsed, count / elapsed if elapsed > 0 else 0.0))
+        print(f"Input pipeline epoch {epoch + 1}: {elapsed:.2f}s, {results[-1][1]:.1f} images/s")
+    return results
 
-print("Optimizing Datasets...")
 
-train_ds = train_ds_raw.map(preprocess).shuffle(200).prefetch(AUTOTUNE)
-val_ds = val_ds_raw.map(preprocess).prefetch(AUTOTUNE)
-test_ds = test_ds_raw.map(preprocess).prefetch(AUTOTUNE)
+# 4. FACTORY
+def build_datasets(source=None, img_size=IMG_SIZE, batch_size=BATCH_SIZE):
+    source = source or DATA_SOURCE
+    if source not in _LOADERS:
+        raise ValueError(f"Unknown data source '{source}'. Choose from: {', '.join(SOURCES)}")
+
+    train_raw, val_raw, test_raw = _LOADERS[source](tuple(img_size), batch_size)
+
+    train_count = len(train_raw.file_paths)
+    val_count = len(val_raw.file_paths)
+    test_count = val_count if test_raw is None else len(test_raw.file_paths)
+    # One decision for all splits, so together they stay within the memory budget
+    mode = cache_mode(train_count + val_count + (0 if test_raw is None else test_count), img_size)
+    print(f"Optimizing Datasets... (cache: {mode})")
+    train_ds = optimize(train_raw, f"{source}_train", train_count, batch_size, shuffle=True, img_size=img_size,
+                        mode=mode)
+    val_ds = optimize(val_raw, f"{source}_val", val_count, batch_size, img_size=img_size, mode=mode)
+    if test_raw is None:
+        # Use Validation as Test set
+        test_ds = val_ds
+    else:
+        test_ds = optimize(test_raw, f"{source}_test", test_count, batch_size, img_size=img_size, mode=mode)
+
+    class_names = train_raw.class_names
+    print(f"Success! Found {len(class_names)} classes.")
+    return PlantDatasets(source, train_ds, val_ds, test_ds, class_names, train_count, val_count, test_count)
+
+
+# 5. OLD MODULE-LEVEL NAMES
+# "from image_preprocessing_file import train_ds, class_names" keeps working: the default source is built the first
+# time one of these names is looked up, and only once.
+_default_datasets = None
+_default_lock = threading.Lock()
+_LAZY_NAMES = ("train_ds", "val_ds", "test_ds", "class_names", "train_count", "val_count")
+
+
+def get_default_datasets():
+    global _default_datasets
+    with _default_lock:
+        if _default_datasets is None:
+            _default_datasets = build_datasets()
+        return _default_datasets
+
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        return getattr(get_default_datasets(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-class_names = train_ds_raw.class_names
-print(f"Success! Found {len(class_names)} classes.")
 
 # Export for other files
-__all__ = ["train_ds", "val_ds", "test_ds", "IMG_SIZE", "class_names"]
+__all__ = ["build_datasets", "PlantDatasets", "SOURCES", "IMG_SIZE", "BATCH_SIZE", "INPUT_SCALE"] + list(_LAZY_NAMES)
+
+if __name__ == "__main__":
+    # python image_preprocessing_file.py [source]
+    measure_throughput(build_datasets(sys.argv[1] if len(sys.argv) > 1 else None).train_ds)
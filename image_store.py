@@ -0,0 +1,144 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Content-addressed storage for the saved_images folder. Every photo is stored once, as a read-only blob
+# named by the SHA-256 of its bytes alone (in <folder>/.store/objects/), so the same photo under another name or
+# extension is the same blob. The friendly file the user sees in the folder ("plant_<timestamp>_<hash>.jpg") is a
+# separate copy of that blob, not a hard link: editing or overwriting it in place can never change the stored blob.
+# A small JSON index maps the friendly names to blobs. Saving a photo that is already stored just returns its existing
+# name, so repeated saves cost one hash lookup (usually memoized by content_hash) and no disk space; if the user has
+# edited that friendly file since, the photo gets a new friendly copy instead. Blobs and the index are written under a
+# temporary name and renamed into place, so a crash never leaves half a file.
+
+import json
+import os
+import shutil
+import stat
+import threading
+from datetime import datetime
+
+from content_hash import file_digest
+
+STORE_DIR = ".store"
+INDEX_NAME = "index.json"
+
+
+class ImageStore:
+    def __init__(self, folder, prefix="plant"):
+        self.folder = folder
+        self.prefix = prefix
+        self.objects_dir = os.path.join(folder, STORE_DIR, "objects")
+        self.index_path = os.path.join(folder, STORE_DIR, INDEX_NAME)
+        self._lock = threading.Lock()
+        self._entries = None  # {friendly name: {"blob", "source", "saved"}}, read on first use
+        self._by_blob = {}
+
+    # 1. SAVING
+    # Stores the file and returns (path of its friendly file, True if it was new or False if already stored).
+    def save(self, source_path):
+        blob = file_digest(source_path)
+        with self._lock:
+            self._load_index()
+            name = self._by_blob.get(blob)
+            if name is not None and self._was_edited(name, blob):
+                # The user changed that file; it keeps their edit and the photo gets a new friendly copy
+                del self._entries[name]
+                name = None
+            is_new = name is None
+            if is_new:
+                name = self._new_name(blob, source_path)
+
+            blob_path = self.blob_path(blob)
+            if not os.path.exists(blob_path):
+                _atomic_copy(source_path, blob_path, read_only=True)
+            friendly_path = os.path.join(self.folder, name)
+            if not os.path.exists(friendly_path):
+                # Also puts back a friendly file the user deleted from the folder
+                _atomic_copy(blob_path, friendly_path)
+
+            if is_new:
+                self._entries[name] = {"blob": blob, "source": os.path.basename(source_path),
+                                       "saved": datetime.now().isoformat(timespec="seconds")}
+                self._by_blob[blob] = name
+                self._write_index()
+        return friendly_path, is_new
+
+    def _new_name(self, blob, source_path):
+        # The friendly name keeps the extension of the first file saved with this content
+        ext = os.path.splitext(source_path)[1].lower()
+        stem = f"{self.prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{blob[:8]}"
+        name, n = f"{stem}{ext}", 1
+        while name in self._entries or os.path.exists(os.path.join(self.folder, name)):
+            name, n = f"{stem}_{n}{ext}", n + 1
+        return name
+
+    def _was_edited(self, name, blob):
+        # A friendly file that is still there but no longer holds the stored bytes (a deleted one is simply put back)
+        path = os.path.join(self.folder, name)
+        return os.path.exists(path) and file_digest(path) != blob
+
+    # 2. LOOKUP
+    def blob_path(self, blob):
+        return os.path.join(self.objects_dir, blob[:2], blob)
+
+    def entries(self):
+        with self._lock:
+            self._load_index()
+            return dict(self._entries)
+
+    # Returns the friendly path of a stored copy of this file, or None.
+    def find(self, source_path):
+        blob = file_digest(source_path)
+        with self._lock:
+            self._load_index()
+            name = self._by_blob.get(blob)
+            if name is None or self._was_edited(name, blob):
+                return None
+        return os.path.join(self.folder, name)
+
+    # 3. CLEAN-UP
+    # Forgets friendly files the user has deleted from the folder and removes blobs nothing points to any more.
+    # Returns the number of blobs removed.
+    def prune(self):
+        with self._lock:
+            self._load_index()
+            for name in [n for n in self._entries if not os.path.exists(os.path.join(self.folder, n))]:
+                del self._by_blob[self._entries.pop(name)["blob"]]
+            self._write_index()
+
+            removed = 0
+            if os.path.isdir(self.objects_dir):
+                for shard in os.listdir(self.objects_dir):
+                    for blob in os.listdir(os.path.join(self.objects_dir, shard)):
+                        if blob not in self._by_blob:
+                            path = os.path.join(self.objects_dir, shard, blob)
+                            os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)  # Windows will not delete a read-only file
+                            os.remove(path)
+                            removed += 1
+            return removed
+
+    # INDEX
+    def _load_index(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self.index_path, "r") as f:
+                self._entries = json.load(f)["names"]
+        except (OSError, ValueError, KeyError):
+            self._entries = {}  # no index yet, or a damaged one; stored blobs are re-indexed as they are saved again
+        self._by_blob = {entry["blob"]: name for name, entry in self._entries.items()}
+
+    def _write_index(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"names": self._entries}, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+
+def _atomic_copy(source_path, destination, read_only=False):
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    tmp_path = f"{destination}.{threading.get_ident()}.tmp"
+    shutil.copyfile(source_path, tmp_path)
+    if read_only:
+        os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    os.replace(tmp_path, destination)
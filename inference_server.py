@@ -0,0 +1,272 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Runs model_predict as a small HTTP service, so several greenhouse tablets can share one copy of the
+# models instead of each GUI loading its own. Uploads are decoded on the request threads and then queued; one batching
+# thread takes whatever is waiting (up to --max-batch-size images, waiting at most --max-wait-ms for more to arrive)
+# and runs them through the models together. When the queue is full new uploads get 503 and a Retry-After header
+# instead of waiting behind work the server cannot keep up with.
+# Endpoints:
+#   POST /predict   body = the image file's bytes -> {"is_plant", "label", "class", "confidence"}
+#   GET  /health    200 once the models are loaded, 503 before
+#   GET  /metrics   Prometheus text: queue depth, request latency quantiles, batch sizes, rejected requests, plus the
+#                   per-stage timings from instrumentation.py (turned on by the server)
+# Usage: python inference_server.py [--port 8080] [--max-batch-size 16] [--max-wait-ms 10] [--max-queue 64]
+# load_generator.py measures throughput against a running server.
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import instrumentation
+import model_predict
+from model_registry import READY
+
+RESULT_FIELDS = ("is_plant", "label", "class", "confidence")
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+REQUEST_TIMEOUT = 30.0
+LATENCY_WINDOW = 2048  # the quantiles cover this many most recent requests
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class QueueFull(Exception):
+    pass
+
+
+# 1. MICRO-BATCHING
+class MicroBatcher:
+    # run_batch gets a (N, H, W, 3) uint8 array and returns N results. pad_to pads every batch to that size (XLA
+    # compiles one program per batch size).
+    def __init__(self, run_batch, max_batch_size=16, max_wait_ms=10, max_queue=64, pad_to=None):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.pad_to = pad_to
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopped = threading.Event()
+        self._thread = None
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="micro-batcher")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    # Queues one decoded image and returns a Future for its result. Raises QueueFull instead of blocking.
+    def submit(self, image):
+        future = Future()
+        try:
+            self._queue.put_nowait((image, future))
+        except queue.Full:
+            raise QueueFull() from None
+        return future
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._run(batch)
+
+    def _run(self, batch):
+        images = np.stack([image for image, _ in batch])
+        if self.pad_to and len(images) < self.pad_to:
+            padding = np.zeros((self.pad_to - len(images),) + images.shape[1:], dtype=images.dtype)
+            images = np.concatenate([images, padding])
+        self.batch_sizes.append(len(batch))
+        try:
+            results = self.run_batch(images)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+# 2. REQUEST METRICS
+class ServerStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {"ok": 0, "bad_request": 0, "rejected": 0, "error": 0}
+
+    def record(self, outcome, latency_ms=None):
+        with self._lock:
+            self.counts[outcome] += 1
+            if latency_ms is not None:
+                self.latencies_ms.append(latency_ms)
+
+    def quantiles(self):
+        with self._lock:
+            latencies = list(self.latencies_ms)
+        if not latencies:
+            return {q: 0.0 for q in QUANTILES}
+        return dict(zip(QUANTILES, np.percentile(latencies, [q * 100 for q in QUANTILES])))
+
+    def prometheus_text(self, batcher):
+        lines = ["# HELP plant_server_queue_depth Images waiting for a batch.",
+                 "# TYPE plant_server_queue_depth gauge",
+                 f"plant_server_queue_depth {batcher.queue_depth()}",
+                 "# HELP plant_server_request_latency_seconds Upload to response, recent successful requests.",
+                 "# TYPE plant_server_request_latency_seconds summary"]
+        for q, value in self.quantiles().items():
+            lines.append(f'plant_server_request_latency_seconds{{quantile="{q}"}} {value / 1000:.6f}')
+        with self._lock:
+            lines.append(f"plant_server_request_latency_seconds_count {self.counts['ok']}")
+            lines += ["# HELP plant_server_requests_total Requests by outcome.",
+                      "# TYPE plant_server_requests_total counter"]
+            for outcome, count in self.counts.items():
+                lines.append(f'plant_server_requests_total{{outcome="{outcome}"}} {count}')
+        sizes = list(batcher.batch_sizes)
+        lines += ["# HELP plant_server_batch_size_mean Mean images per model call, recent batches.",
+                  "# TYPE plant_server_batch_size_mean gauge",
+                  f"plant_server_batch_size_mean {np.mean(sizes) if sizes else 0.0:.3f}"]
+        return "\n".join(lines) + "\n" + instrumentation.prometheus_text()
+
+
+# 3. HTTP
+class InferenceHandler(BaseHTTPRequestHandler):
+    # self.server.batcher and self.server.stats are set by make_server()
+    server_version = "PlantHealthChecker/1.0"
+
+    def log_message(self, format, *args):
+        pass  # one line per request is too noisy under load; see /metrics instead
+
+    def _send(self, status, body, content_type="application/json", headers=()):
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status, payload, headers=()):
+        self._send(status, json.dumps(payload), headers=headers)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, self.server.stats.prometheus_text(self.server.batcher),
+                       content_type="text/plain; version=0.0.4")
+        elif self.path == "/health":
+            ready = model_predict.models_ready()
+            self._send_json(200 if ready else 503, {"ready": ready, "models": model_predict.model_status()})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+        start = time.perf_counter()
+        stats = self.server.stats
+        length = int(self.headers.get("Content-Length") or 0)
+        if not 0 < length <= MAX_UPLOAD_BYTES:
+            stats.record("bad_request")
+            self._send_json(413 if length else 400, {"error": "expected an image of at most "
+                                                              f"{MAX_UPLOAD_BYTES // (1024 * 1024)} MB"})
+            return
+        data = self.rfile.read(length)
+
+        try:
+            image = model_predict.decode_image_bytes(data)
+        except Exception as e:
+            stats.record("bad_request")
+            self._send_json(400, {"error": f"could not decode image: {e}"})
+            return
+
+        try:
+            future = self.server.batcher.submit(image)
+        except QueueFull:
+            stats.record("rejected")
+            self._send_json(503, {"error": "server busy"}, headers=[("Retry-After", "1")])
+            return
+
+        try:
+            result = future.result(timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            stats.record("error")
+            self._send_json(500, {"error": str(e) or type(e).__name__})
+            return
+        stats.record("ok", (time.perf_counter() - start) * 1000)
+        self._send_json(200, dict(zip(RESULT_FIELDS, result)))
+
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Listen backlog. The default of 5 resets connections in a burst; they should reach the handler and get a 503.
+    request_queue_size = 128
+
+
+def make_server(host, port, batcher):
+    server = InferenceServer((host, port), InferenceHandler)
+    server.batcher = batcher
+    server.stats = ServerStats()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve plant health predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (0.0.0.0 for the whole network).")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch-size", type=int, default=16, help="Most images per model call.")
+    parser.add_argument("--max-wait-ms", type=float, default=10,
+                        help="How long a batch waits for more images before it runs.")
+    parser.add_argument("--max-queue", type=int, default=64, help="Queued images before new uploads get 503.")
+    args = parser.parse_args()
+
+    instrumentation.enable()
+    print("Loading models...")
+    model_predict.warm_up(background=False)
+    if any(status != READY for status in model_predict.model_status().values()):
+        print(f"Models failed to load: {model_predict.model_status()}")
+        return 1
+
+    batcher = MicroBatcher(model_predict.analyze_batch, args.max_batch_size, args.max_wait_ms, args.max_queue,
+                           pad_to=args.max_batch_size if model_predict.USE_XLA else None).start()
+    server = make_server(args.host, args.port, batcher)
+    print(f"Serving on http://{args.host}:{server.server_port} "
+          f"(batches of up to {args.max_batch_size}, {args.max_wait_ms:g} ms wait, queue {args.max_queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
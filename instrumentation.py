@@ -0,0 +1,154 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Opt-in timing of the prediction stages (file read, decode, resize, gatekeeper forward, disease forward,
+# postprocessing; with the two-headed model the two forward stages are replaced by a single "shared" stage). Turn it
+# on with the environment variable PLANT_TIMING=1 or instrumentation.enable().
+# Each timed stage:
+#   - goes into a per-stage counter and latency histogram: snapshot() returns them as a dict, prometheus_text() in
+#     the Prometheus text format for scraping
+#   - is logged as a record on the "plant_health.timing" logger with the extra fields "stage" and "duration_ms"
+#     (INFO level, so it stays quiet unless logging is configured)
+# When timing is off, stage() hands back one shared do-nothing object, so the cost is a single function call.
+# Usage:
+#   with instrumentation.stage("decode"):
+#       ...
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("plant_health.timing")
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_enabled = os.environ.get("PLANT_TIMING", "0") == "1"
+_lock = threading.Lock()
+_stats = {}
+
+
+class _StageStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        # bucket_counts[i] counts durations <= BUCKETS_MS[i]; the last slot is everything slower
+        self.bucket_counts = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, duration_ms, failed):
+        self.count += 1
+        self.errors += int(failed)
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        for i, bound in enumerate(BUCKETS_MS):
+            if duration_ms <= bound:
+                self.bucket_counts[i] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, (time.perf_counter() - self.start) * 1000, failed=exc_type is not None)
+        return False
+
+
+# 1. SWITCH
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+# 2. RECORDING
+def stage(name):
+    if not _enabled:
+        return _NULL_TIMER
+    return _StageTimer(name)
+
+
+def record(name, duration_ms, failed=False):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = _StageStats()
+        stats.add(duration_ms, failed)
+    logger.info("%s took %.2f ms", name, duration_ms,
+                extra={"stage": name, "duration_ms": duration_ms, "failed": failed})
+
+
+# 3. READING THE NUMBERS
+def snapshot():
+    # {stage: {"count", "errors", "total_ms", "mean_ms", "max_ms", "buckets": {"<=1": n, ..., "+Inf": n}}}
+    # Bucket counts are per bucket, not cumulative.
+    with _lock:
+        result = {}
+        for name, stats in _stats.items():
+            labels = [f"<={bound}" for bound in BUCKETS_MS] + ["+Inf"]
+            result[name] = {
+                "count": stats.count,
+                "errors": stats.errors,
+                "total_ms": stats.total_ms,
+                "mean_ms": stats.total_ms / stats.count if stats.count else 0.0,
+                "max_ms": stats.max_ms,
+                "buckets": dict(zip(labels, stats.bucket_counts)),
+            }
+        return result
+
+
+def prometheus_text():
+    # Prometheus histogram (cumulative buckets, seconds) plus an error counter per stage
+    lines = ["# HELP plant_stage_duration_seconds Time spent in each prediction stage.",
+             "# TYPE plant_stage_duration_seconds histogram"]
+    with _lock:
+        items = sorted(_stats.items())
+        for name, stats in items:
+            cumulative = 0
+            for bound, count in zip(BUCKETS_MS, stats.bucket_counts):
+                cumulative += count
+                lines.append(f'plant_stage_duration_seconds_bucket{{stage="{name}",le="{bound / 1000:g}"}} '
+                             f'{cumulative}')
+            lines.append(f'plant_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {stats.count}')
+            lines.append(f'plant_stage_duration_seconds_sum{{stage="{name}"}} {stats.total_ms / 1000:.6f}')
+            lines.append(f'plant_stage_duration_seconds_count{{stage="{name}"}} {stats.count}')
+        lines += ["# HELP plant_stage_errors_total Stage runs that raised an exception.",
+                  "# TYPE plant_stage_errors_total counter"]
+        for name, stats in items:
+            lines.append(f'plant_stage_errors_total{{stage="{name}"}} {stats.errors}')
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _stats.clear()
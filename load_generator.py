@@ -0,0 +1,131 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Load test for inference_server.py. Several client threads upload photos as fast as the server answers
+# (closed loop, like tablets that each wait for their result) and the script reports throughput, latency percentiles
+# and how many uploads were turned away with 503. The server's own /metrics (queue depth, batch size) are printed at
+# the end.
+# Usage:
+#   python inference_server.py --port 8080 &
+#   python load_generator.py --url http://127.0.0.1:8080 --concurrency 16 --requests 400 [--folder "Plant Dataset/Test"]
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+import numpy as np
+
+from batch_predict import iter_image_paths
+
+DEFAULT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Plant Dataset", "Test")
+
+
+def post_image(url, data, timeout=60):
+    # Returns (HTTP status, seconds)
+    request = urllib.request.Request(f"{url}/predict", data=data, method="POST",
+                                     headers={"Content-Type": "application/octet-stream"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 0  # connection refused, reset or timed out
+    return status, time.perf_counter() - start
+
+
+def run_load(url, images, concurrency, total_requests):
+    # Sends total_requests uploads from concurrency threads, cycling through the images.
+    # Returns (elapsed seconds, [(status, seconds), ...]).
+    results = []
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def client():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            outcome = post_image(url, images[i % len(images)])
+            with lock:
+                results.append(outcome)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, results
+
+
+def summarize(elapsed, results):
+    statuses = Counter(status for status, _ in results)
+    ok_ms = [seconds * 1000 for status, seconds in results if status == 200]
+    p50, p95, p99 = np.percentile(ok_ms, [50, 95, 99]) if ok_ms else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(results),
+        "seconds": elapsed,
+        "ok_per_s": len(ok_ms) / max(elapsed, 1e-9),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def server_metrics(url):
+    # The plant_server_* lines of /metrics, or [] if they cannot be fetched
+    try:
+        with urllib.request.urlopen(f"{url}/metrics", timeout=10) as response:
+            text = response.read().decode()
+    except OSError:
+        return []
+    return [line for line in text.splitlines() if line.startswith("plant_server_")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure inference_server.py throughput.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="Server address.")
+    parser.add_argument("--folder", default=DEFAULT_FOLDER, help="Folder of photos to upload.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads sending at the same time.")
+    parser.add_argument("--requests", type=int, default=200, help="Uploads in total.")
+    parser.add_argument("--json", help="Also write the summary to this JSON file.")
+    args = parser.parse_args()
+
+    paths = list(iter_image_paths(args.folder))
+    if not paths:
+        print(f"No images found in {args.folder}")
+        return 1
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append(f.read())
+
+    url = args.url.rstrip("/")
+    summary = summarize(*run_load(url, images, args.concurrency, args.requests))
+    summary["concurrency"] = args.concurrency
+
+    print(f"{summary['requests']} requests from {args.concurrency} clients in {summary['seconds']:.2f} s")
+    print(f"Throughput: {summary['ok_per_s']:.1f} images/s")
+    print(f"Latency: p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms, p99 {summary['p99_ms']:.1f} ms")
+    print(f"Responses: {summary['statuses']}")
+    for line in server_metrics(url):
+        print(f"  {line}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if summary["statuses"].get("200") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Records how the saved models expect their input, so a model file is never fed pixels on a different
+# scale from the one it was trained on. CNN_Build.py writes model_info.json next to the models it saves, with the
+# SHA-256 of each file and the input scale (image_preprocessing_file.INPUT_SCALE) it was trained with; model_predict
+# checks a model against it before loading it. A model with a different scale is refused. A model without an entry
+# (saved before these records were kept, or replaced since) still loads, with a warning to retrain it.
+
+import json
+import math
+import os
+import threading
+from datetime import datetime
+
+from content_hash import file_digest
+
+INFO_NAME = "model_info.json"
+
+
+def info_path(model_path):
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), INFO_NAME)
+
+
+def _read_models(path):
+    try:
+        with open(path, "r") as f:
+            return dict(json.load(f)["models"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+# Adds (or replaces) the entries of these model files; entries of other files in the same folder are kept.
+def record_models(model_paths, input_scale, **details):
+    saved = datetime.now().isoformat(timespec="seconds")
+    by_folder = {}
+    for path in model_paths:
+        by_folder.setdefault(info_path(path), []).append(path)
+    for path, paths in by_folder.items():
+        models = _read_models(path)
+        for model_path in paths:
+            models[os.path.basename(model_path)] = dict(details, sha256=file_digest(model_path),
+                                                        input_scale=input_scale, saved=saved)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"models": models}, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+# The input scale recorded for this exact file, or None if it has no entry
+def recorded_input_scale(model_path):
+    entry = _read_models(info_path(model_path)).get(os.path.basename(model_path))
+    if entry is None or entry.get("sha256") != file_digest(model_path):
+        return None
+    return entry.get("input_scale")
+
+
+# Raises ValueError if the model was trained with another input scale. Returns False (after a warning) if nothing is
+# recorded for it, True if the scales match.
+def check_input_scale(model_path, input_scale):
+    recorded = recorded_input_scale(model_path)
+    if recorded is None:
+        print(f"Warning: {os.path.basename(model_path)} has no entry in {INFO_NAME}. It is fed pixels scaled by "
+              f"{input_scale:.6g}; if it was trained on another scale (e.g. raw 0-255 pixels) its predictions are "
+              f"wrong. Retrain it with CNN_Build.py.")
+        return False
+    if not math.isclose(recorded, input_scale):
+        raise ValueError(f"{model_path} was trained on pixels scaled by {recorded:.6g}, but it would be fed pixels "
+                         f"scaled by {input_scale:.6g}. Retrain it with CNN_Build.py.")
+    return True
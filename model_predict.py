@@ -2,103 +2,686 @@
 # Author: Faith Akinlade, Smit Desai, Pratham Waghela
 # Description: Loads the trained CNN model and class names, and provides a function to predict the health status of a
 # plant from a given image. Returns the predicted class and confidence score.
+# Models are loaded on first use through a ModelRegistry, so importing this file is instant. Call warm_up() to load
+# them on a background thread ahead of time.
+# Set PLANT_TIMING=1 (or call instrumentation.enable()) to time each stage of a prediction; see instrumentation.py.
 
-import tensorflow as tf
 import numpy as np
+import io
 import json
 import os
-from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2, preprocess_input, decode_predictions
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from PIL import Image
+from model_registry import READY, ModelRegistry
+from content_hash import file_digest, files_fingerprint
+from image_preprocessing_file import INPUT_SCALE
+from model_info import check_input_scale
+from prediction_cache import PredictionCache
+from tflite_backend import TFLITE_PATHS, TFLiteModel
+from serving import ServingModel
+import instrumentation
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# 1. LOAD DISEASE MODEL
 model_path = os.path.join(BASE_DIR, "plant_health_model.keras")
-try:
-    model = tf.keras.models.load_model(model_path)
-    print("Custom Disease Model Loaded.")
-except Exception as e:
-    print(f"Error loading disease model: {e}")
-    model = None
-
-# Load class names
 json_path = os.path.join(BASE_DIR, "class_names.json")
-try:
+
+IMG_SIZE = (224, 224)
+
+# Disease model backend: "keras" (the float32 .keras file) or a quantized TFLite export from CNN_Build.py
+# ("tflite-fp16" / "tflite-int8"). Pick one with the PLANT_MODEL_BACKEND environment variable or set_backend().
+BACKENDS = ("keras", "tflite-fp16", "tflite-int8")
+BACKEND = os.environ.get("PLANT_MODEL_BACKEND", "keras")
+
+# Keras models run through a traced tf.function (see serving.py). PLANT_XLA=1 also compiles them with XLA.
+USE_XLA = os.environ.get("PLANT_XLA", "0") == "1"
+
+# JPEG photos are decoded straight at a reduced size (1/2, 1/4 or 1/8 scale, done by libjpeg in the DCT domain and never
+# smaller than the model input) before the final resize, instead of decoding all 12-48 megapixels first. Set
+# PLANT_FAST_DECODE=0 to decode at full size. check_fast_decode.py compares the two.
+FAST_DECODE = os.environ.get("PLANT_FAST_DECODE", "1") != "0"
+
+# Prediction cache (set PLANT_CACHE=0 to turn it off)
+CACHE_ENABLED = os.environ.get("PLANT_CACHE", "1") != "0"
+CACHE_PATH = os.path.join(BASE_DIR, "cache", "predictions.sqlite3")
+CACHE_MEMORY_ENTRIES = 256
+
+# Batched inference settings
+DEFAULT_BATCH_SIZE = 32
+DECODE_WORKERS = min(8, os.cpu_count() or 1)
+
+PLANT_KEYWORDS = [
+    'plant', 'leaf', 'flower', 'fruit', 'vegetable', 'tree', 'grass',
+    'garden', 'pot', 'greenhouse', 'agriculture', 'orchard', 'forest',
+    'corn', 'ear', 'maize', 'apple', 'orange', 'lemon', 'banana',
+    'pomegranate', 'strawberry', 'grape', 'cherry', 'peach', 'fig',
+    'pineapple', 'pepper', 'cucumber', 'zucchini', 'broccoli', 'cabbage',
+    'cauliflower', 'potato', 'mushroom', 'fungus', 'hay', 'straw', 'velvet',
+    'nematode', 'slug', 'snail', 'background', 'tissue', 'pattern'
+]
+
+# ImageNet classes that are plants, fungi or plant produce but whose labels contain none of the keywords
+# (head_cabbage to pomegranate, rapeseed to ear, pot, greenhouse)
+PLANT_CLASS_IDS = sorted(set(range(936, 958)) | set(range(984, 999)) | {738, 580})
+
+# Gatekeeper: an image counts as a plant when the ImageNet probabilities of all plant classes add up to at least
+# PLANT_THRESHOLD. PLANT_GATEKEEPER picks the MobileNetV2 width and input size; the smaller ones are faster and
+# benchmark_gatekeeper.py measures how often they agree with the full "1.0_224" model.
+GATEKEEPERS = ("1.0_224", "0.75_224", "0.5_224", "0.5_160", "0.35_224", "0.35_128")
+GATEKEEPER = os.environ.get("PLANT_GATEKEEPER", "1.0_224")
+PLANT_THRESHOLD = float(os.environ.get("PLANT_THRESHOLD", "0.15"))
+IMAGENET_LABELS_URL = "https://storage.googleapis.com/download.tensorflow.org/data/imagenet_class_index.json"
+
+# Shared backbone: with a model trained by "CNN_Build.py --arch two_headed", PLANT_SHARED_MODEL=1 (or
+# set_shared_model(True)) answers both questions from one MobileNetV2 pass, using the backbone's own ImageNet output for
+# the plant verdict instead of loading the separate gatekeeper. benchmark_shared_model.py compares the two paths.
+SHARED_MODEL = os.environ.get("PLANT_SHARED_MODEL", "0") == "1"
+
+
+# 1. MODEL LOADERS (TensorFlow is only imported once a model is actually needed)
+def disease_model_path(backend=None):
+    backend = backend or BACKEND
+    if backend == "keras":
+        return model_path
+    return TFLITE_PATHS[backend.split("-", 1)[1]]
+
+
+def _serving_batch_sizes():
+    # Batch sizes to warm up: single images for the GUI, plus the padded batch size when XLA compiles per size.
+    return (1, DEFAULT_BATCH_SIZE) if USE_XLA else (1,)
+
+
+def _load_disease_model():
+    check_input_scale(disease_model_path(), DISEASE_INPUT_SCALE)
+    fingerprint = _model_file_fingerprint(shared=False)
+    if BACKEND == "keras":
+        import tensorflow as tf
+        loaded = ServingModel(tf.keras.models.load_model(model_path), jit_compile=USE_XLA,
+                              warm_up_batch_sizes=_serving_batch_sizes())
+    else:
+        loaded = TFLiteModel(disease_model_path())
+    _loaded_fingerprints["disease"] = (loaded, fingerprint)
+    print(f"Custom Disease Model Loaded ({BACKEND}).")
+    return loaded
+
+
+def _load_class_names():
     with open(json_path, "r") as f:
-        class_names = json.load(f)
-        print(f"Loaded {len(class_names)} Class Names.")
-except Exception as e:
-    print(f"Error loading class names: {e}")
-    class_names = []
+        names = json.load(f)
+    print(f"Loaded {len(names)} Class Names.")
+    return names
 
-# 2. LOAD GATEKEEPER
-print("Loading Plant Validator...")
-validator_model = MobileNetV2(weights='imagenet')
-print("Plant Validator Loaded.")
 
-IMG_SIZE = (224, 224)
+def gatekeeper_spec(gatekeeper=None):
+    # "0.5_160" -> (0.5, 160): MobileNetV2 width multiplier and input size
+    alpha, size = (gatekeeper or GATEKEEPER).split("_")
+    return float(alpha), int(size)
+
+
+def _load_validator_model():
+    from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2
+    print(f"Loading Plant Validator ({GATEKEEPER})...")
+    alpha, size = gatekeeper_spec()
+    loaded = ServingModel(MobileNetV2(input_shape=(size, size, 3), alpha=alpha, weights='imagenet'),
+                          jit_compile=USE_XLA, warm_up_batch_sizes=_serving_batch_sizes())
+    print("Plant Validator Loaded.")
+    return loaded
+
+
+def _load_shared_model():
+    import tensorflow as tf
+    from architectures import two_headed_outputs
+    check_input_scale(model_path, DISEASE_INPUT_SCALE)
+    fingerprint = _model_file_fingerprint(shared=True)
+    trained = tf.keras.models.load_model(model_path)
+    if trained.name != "two_headed":
+        raise ValueError(f"{model_path} is a '{trained.name}' model; train one with CNN_Build.py --arch two_headed.")
+    loaded = ServingModel(two_headed_outputs(trained), jit_compile=USE_XLA, warm_up_batch_sizes=_serving_batch_sizes())
+    _loaded_fingerprints["shared"] = (loaded, fingerprint)
+    print("Shared Plant/Disease Model Loaded.")
+    return loaded
+
+
+def _load_imagenet_labels():
+    # The same label file (and cache folder) that keras decode_predictions uses
+    from tensorflow.keras.utils import get_file
+    path = get_file("imagenet_class_index.json", IMAGENET_LABELS_URL, cache_subdir="models")
+    with open(path, "r") as f:
+        index = json.load(f)
+    return [index[str(i)][1] for i in range(len(index))]
+
+
+def plant_class_mask(labels):
+    # Boolean mask over the ImageNet classes: PLANT_CLASS_IDS plus every label with a keyword as one of its words.
+    # Whole words only, so "ear" does not pick up the bear classes or "pot" the teapot.
+    mask = np.zeros(len(labels), dtype=bool)
+    mask[[i for i in PLANT_CLASS_IDS if i < len(labels)]] = True
+    keywords = set(PLANT_KEYWORDS)
+    for i, label in enumerate(labels):
+        if keywords.intersection(label.lower().replace("-", "_").split("_")):
+            mask[i] = True
+    return mask
+
+
+def _load_plant_class_ids():
+    labels = get_imagenet_labels()
+    if labels is None:
+        raise RuntimeError("ImageNet labels are not available.")
+    return np.flatnonzero(plant_class_mask(labels))
+
+
+registry = ModelRegistry()
+registry.register("class_names", _load_class_names)
+registry.register("disease", _load_disease_model)
+registry.register("validator", _load_validator_model)
+registry.register("shared", _load_shared_model)
+registry.register("imagenet_labels", _load_imagenet_labels)
+registry.register("plant_class_ids", _load_plant_class_ids)
+
+MODEL_NAMES = ["class_names", "disease", "validator", "imagenet_labels", "plant_class_ids"]
+SHARED_MODEL_NAMES = ["class_names", "shared", "imagenet_labels", "plant_class_ids"]
+
+
+def active_model_names():
+    return SHARED_MODEL_NAMES if SHARED_MODEL else MODEL_NAMES
+
+
+# Switches the disease model backend; the new model is loaded on next use.
+def set_backend(backend):
+    global BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    BACKEND = backend
+    registry.reset("disease")
+
+
+# Switches the gatekeeper to another MobileNetV2 size; it is loaded on next use.
+def set_gatekeeper(gatekeeper):
+    global GATEKEEPER
+    if gatekeeper not in GATEKEEPERS:
+        raise ValueError(f"Unknown gatekeeper '{gatekeeper}'. Choose from: {', '.join(GATEKEEPERS)}")
+    GATEKEEPER = gatekeeper
+    registry.reset("validator")
+
+
+# Switches between the two-model path and the two-headed model; takes effect on the next prediction.
+def set_shared_model(enabled):
+    global SHARED_MODEL
+    SHARED_MODEL = bool(enabled)
+
+
+def get_model():
+    return registry.get("disease")
+
+
+def get_shared_model():
+    return registry.get("shared")
+
+
+def get_validator_model():
+    return registry.get("validator")
+
+
+def get_class_names():
+    return registry.get("class_names") or []
+
+
+def get_imagenet_labels():
+    return registry.get("imagenet_labels")
+
+
+def get_plant_class_ids():
+    return registry.get("plant_class_ids")
+
+
+# 2. READINESS
+# Starts loading every model on a background thread and returns straight away.
+def warm_up(background=True, on_done=None):
+    return registry.warm_up(active_model_names(), background=background, on_done=on_done)
+
+
+def models_ready():
+    return registry.all_settled(active_model_names())
+
+
+def model_status():
+    return {name: registry.status(name) for name in active_model_names()}
+
+
+# 3. PREDICTION CACHE
+_prediction_cache = None
+
+
+def get_prediction_cache():
+    global _prediction_cache
+    if _prediction_cache is None:
+        _prediction_cache = PredictionCache(CACHE_PATH, max_entries=CACHE_MEMORY_ENTRIES)
+    return _prediction_cache
+
+
+# Registry name -> (loaded model, fingerprint of the file it was read from), recorded by the loaders
+_loaded_fingerprints = {}
+
+
+def _model_file_fingerprint(shared):
+    # The disease model file as it is on disk now, plus how it is run: backend, input scaling and decoding
+    path = model_path if shared else disease_model_path()
+    return files_fingerprint([path], extra=["shared" if shared else BACKEND, DISEASE_INPUT_SCALE,
+                                            "fast_decode" if FAST_DECODE else "full_decode"])
+
+
+# Identifies what the disease outputs depend on. Once the model is loaded this is the fingerprint of the file it was
+# actually loaded from, so replacing the file or changing model_path without reloading does not change the answers'
+# key; a reload (set_backend, set_shared_model, registry.reset) picks up the new file. Unlike model_fingerprint() it
+# ignores the gatekeeper settings and class_names.json; evaluate.py keys its stored outputs by it.
+def disease_fingerprint():
+    name = "shared" if SHARED_MODEL else "disease"
+    if registry.status(name) == READY:
+        loaded, fingerprint = _loaded_fingerprints.get(name, (None, None))
+        if loaded is not None and loaded is registry.get(name):
+            return fingerprint
+    return _model_file_fingerprint(SHARED_MODEL)
 
 
+# Identifies the models behind a prediction, the second half of every prediction cache key (after the image's
+# SHA-256). Changes whenever the disease model, class_names.json or the gatekeeper settings change.
+def model_fingerprint():
+    gatekeeper = "shared_backbone" if SHARED_MODEL else f"mobilenet_v2_{GATEKEEPER}_imagenet"
+    return files_fingerprint([json_path], extra=[disease_fingerprint(), gatekeeper, PLANT_KEYWORDS, PLANT_CLASS_IDS,
+                                                 PLANT_THRESHOLD])
+
+
+def cache_stats():
+    if _prediction_cache is None:
+        return {"hits": 0, "misses": 0, "memory_entries": 0, "disk_entries": 0}
+    return _prediction_cache.stats()
+
+
+def _cache_keys(image_path, kinds):
+    # Returns {kind: key} for the image, or None if caching is off or the file cannot be read.
+    if not CACHE_ENABLED:
+        return None
+    try:
+        fingerprint = model_fingerprint()
+        cache = get_prediction_cache()
+        file_hash = file_digest(image_path)
+    except Exception as e:
+        print(f"Cache Error: {e}")
+        return None
+    return {kind: cache.make_key(kind, file_hash, fingerprint) for kind in kinds}
+
+
+def _cache_get(keys, kind):
+    if keys is None:
+        return None
+    return get_prediction_cache().get(keys[kind])
+
+
+def _cache_put(keys, kind, value):
+    if keys is None:
+        return
+    get_prediction_cache().put(keys[kind], list(value))
+
+
+# Keeps "from model_predict import model" (and validator_model / class_names) working; the model is loaded the
+# first time one of these names is looked up.
+def __getattr__(name):
+    if name == "model":
+        return get_model()
+    if name == "validator_model":
+        return get_validator_model()
+    if name == "class_names":
+        return get_class_names()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# 4. IMAGE LOADING
+def load_image_uint8(image_path, target_size=IMG_SIZE, fast_decode=None):
+    # Same steps as tf.keras load_img: decode, force RGB, nearest-neighbour resize. Returns a (H, W, 3) uint8 array.
+    # Uses PIL directly so several images can be decoded in parallel threads. fast_decode=None follows FAST_DECODE.
+    with instrumentation.stage("read"):
+        with open(image_path, "rb") as f:
+            data = f.read()
+    return decode_image_bytes(data, target_size, fast_decode)
+
+
+def decode_image_bytes(data, target_size=IMG_SIZE, fast_decode=None):
+    # The decode and resize half of load_image_uint8, for images that arrive as bytes (e.g. an HTTP upload)
+    with instrumentation.stage("decode"):
+        img = Image.open(io.BytesIO(data))
+        if (FAST_DECODE if fast_decode is None else fast_decode) and img.format == "JPEG":
+            # Asks libjpeg for the smallest 1/2, 1/4 or 1/8 scale that is still at least target_size
+            img.draft("RGB", (target_size[1], target_size[0]))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        else:
+            img.load()
+    with instrumentation.stage("resize"):
+        img = img.resize((target_size[1], target_size[0]), Image.NEAREST)
+        return np.asarray(img, dtype=np.uint8)
+
+
+def load_image_array(image_path, target_size=IMG_SIZE):
+    # Float32 version of load_image_uint8, matching tf.keras img_to_array.
+    return load_image_uint8(image_path, target_size).astype(np.float32)
+
+
+# 5. MODEL INPUTS
+# Both models share one decoded uint8 image; each gets its own scaling from it.
+# The disease model gets [0, 1] pixel values, scaled by the same image_preprocessing_file.INPUT_SCALE it is trained
+# with (the mobilenet_v2 and two_headed architectures map that to [-1, 1] themselves). CNN_Build calibrates the int8
+# TFLite copy with the same scaling.
+DISEASE_INPUT_SCALE = INPUT_SCALE
+
+
+def _validator_input(uint8_batch):
+    from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
+    batch = uint8_batch.astype(np.float32)
+    _, size = gatekeeper_spec()
+    if batch.shape[1:3] != (size, size):
+        import tensorflow as tf
+        batch = tf.image.resize(batch, (size, size)).numpy()
+    return preprocess_input(batch)
+
+
+def _disease_input(uint8_batch):
+    return uint8_batch.astype(np.float32) * np.float32(DISEASE_INPUT_SCALE)
+
+
+def _shared_input(uint8_batch):
+    # The model's first layer maps [0, 1] to MobileNetV2's [-1, 1]; the plant output is only right with that scaling,
+    # so it is fixed here rather than following DISEASE_INPUT_SCALE.
+    return uint8_batch.astype(np.float32) / 255.0
+
+
+def _run_validator(uint8_batch, verbose="auto"):
+    # Returns one (is_plant, label) verdict per image in the batch
+    validator = get_validator_model()
+    # A batched call is timed as one gatekeeper forward pass
+    with instrumentation.stage("gatekeeper"):
+        preds = validator.predict(_validator_input(uint8_batch), verbose=verbose)
+    with instrumentation.stage("postprocess"):
+        return plant_verdicts(np.asarray(preds), get_plant_class_ids(), get_imagenet_labels())
+
+
+def _run_shared(uint8_batch, verbose="auto"):
+    # One pass of the two-headed model. Returns (disease probabilities, one plant verdict per image).
+    shared = get_shared_model()
+    if shared is None:
+        raise RuntimeError("Shared model not loaded")
+    with instrumentation.stage("shared"):
+        outputs = shared.predict(_shared_input(uint8_batch), verbose=verbose)
+    with instrumentation.stage("postprocess"):
+        verdicts = plant_verdicts(outputs["imagenet"], get_plant_class_ids(), get_imagenet_labels())
+    return outputs["disease"], verdicts
+
+
+def _top_class(probabilities):
+    class_index = int(np.argmax(probabilities))
+    return get_class_names()[class_index], float(probabilities[class_index]) * 100
+
+
+# 6. PREDICTION
 def check_if_plant(image_path):
+    keys = _cache_keys(image_path, ["plant"])
+    cached = _cache_get(keys, "plant")
+    if cached is not None:
+        return tuple(cached)
+
     try:
-        img = tf.keras.preprocessing.image.load_img(image_path, target_size=(224, 224))
-        img_array = tf.keras.preprocessing.image.img_to_array(img)
-        img_array = np.expand_dims(img_array, axis=0)
-        img_array = preprocess_input(img_array)
-
-        preds = validator_model.predict(img_array)
-        decoded = decode_predictions(preds, top=3)[0]
-
-        plant_keywords = [
-            'plant', 'leaf', 'flower', 'fruit', 'vegetable', 'tree', 'grass',
-            'garden', 'pot', 'greenhouse', 'agriculture', 'orchard', 'forest',
-            'corn', 'ear', 'maize', 'apple', 'orange', 'lemon', 'banana',
-            'pomegranate', 'strawberry', 'grape', 'cherry', 'peach', 'fig',
-            'pineapple', 'pepper', 'cucumber', 'zucchini', 'broccoli', 'cabbage',
-            'cauliflower', 'potato', 'mushroom', 'fungus', 'hay', 'straw', 'velvet',
-            'nematode', 'slug', 'snail', 'background', 'tissue', 'pattern'
-        ]
-
-        top_prediction = decoded[0][1]
-        for _, label, score in decoded:
-            if any(keyword in label.lower() for keyword in plant_keywords):
-                return True, label
-        return False, top_prediction
+        img_array = np.expand_dims(load_image_uint8(image_path), axis=0)
+        result = (_run_shared(img_array)[1] if SHARED_MODEL else _run_validator(img_array))[0]
     except Exception as e:
         print(f"Validator Error: {e}")
         return True, "Error"
+    _cache_put(keys, "plant", result)
+    return result
 
 
 def predict_image(image_path):
+    model = get_shared_model() if SHARED_MODEL else get_model()
     if model is None:
         return "Model Error", 0.0
 
-    # 1. Load Image
-    img = tf.keras.preprocessing.image.load_img(image_path, target_size=IMG_SIZE)
-    img_array = tf.keras.preprocessing.image.img_to_array(img)
+    keys = _cache_keys(image_path, ["disease"])
+    cached = _cache_get(keys, "disease")
+    if cached is not None:
+        return tuple(cached)
 
-    # DEBUGGING STEP 
-    print(f"DEBUG: Max pixel value BEFORE division: {np.max(img_array)}")
+    img_array = load_image_uint8(image_path)
+    result = _predict_decoded(model, img_array)
+    _cache_put(keys, "disease", result)
+    return result
 
-    # 2. Normalize (Divide by 255.0)
-    # img_array = img_array / 255.0
-
-    # DEBUGGING STEP 
-    print(f"DEBUG: Max pixel value AFTER division: {np.max(img_array)}")
-    # The value here MUST be 1.0. If it is 255, the math is failing.
 
+def _predict_decoded(model, img_array):
     img_array = np.expand_dims(img_array, axis=0)
 
-    # 3. Predict
-    prediction = model.predict(img_array)
+    with instrumentation.stage("disease"):
+        if SHARED_MODEL:
+            prediction = model.predict(_shared_input(img_array))["disease"]
+        else:
+            prediction = model.predict(_disease_input(img_array))
+
+    with instrumentation.stage("postprocess"):
+        return _top_class(prediction[0])
+
+
+# Runs the gatekeeper and the disease model on one decode of the image.
+# Returns (is_plant, detected_label, plant_class, confidence).
+# Both results are cached, so re-analysing the same file skips the decode and both models.
+# cancelled: optional function checked before each expensive stage (decode, each model); once it returns True the
+# analysis stops and returns None, so the GUI's worker is not kept busy by a request nobody will look at.
+def analyze_image(image_path, cancelled=None):
+    cancelled = cancelled or (lambda: False)
+    keys = _cache_keys(image_path, ["plant", "disease"])
+    plant_result = _cache_get(keys, "plant")
+    disease_result = _cache_get(keys, "disease")
+    if plant_result is not None and disease_result is not None:
+        return tuple(plant_result) + tuple(disease_result)
+
+    if cancelled():
+        return None
+    img_array = load_image_uint8(image_path)
+    if cancelled():
+        return None
+
+    if SHARED_MODEL:
+        # One pass of the two-headed model answers both questions
+        try:
+            probabilities, verdicts = _run_shared(np.expand_dims(img_array, axis=0))
+        except Exception as e:
+            print(f"Shared Model Error: {e}")
+            return (True, "Error", "Model Error", 0.0)
+        plant_result, disease_result = verdicts[0], _top_class(probabilities[0])
+        _cache_put(keys, "plant", plant_result)
+        _cache_put(keys, "disease", disease_result)
+        return tuple(plant_result) + tuple(disease_result)
+
+    if plant_result is None:
+        try:
+            plant_result = _run_validator(np.expand_dims(img_array, axis=0))[0]
+            _cache_put(keys, "plant", plant_result)
+        except Exception as e:
+            print(f"Validator Error: {e}")
+            plant_result = (True, "Error")
+
+    if disease_result is None:
+        if cancelled():
+            return None
+        model = get_model()
+        if model is None:
+            return tuple(plant_result) + ("Model Error", 0.0)
+        disease_result = _predict_decoded(model, img_array)
+        _cache_put(keys, "disease", disease_result)
+
+    return tuple(plant_result) + tuple(disease_result)
+
+
+def plant_verdicts(probabilities, plant_ids, labels, threshold=None):
+    # probabilities: (N, 1000) ImageNet softmax outputs. An image is a plant when the probability summed over the
+    # plant classes reaches the threshold; its label is then the most likely plant class, otherwise the top-1 class.
+    threshold = PLANT_THRESHOLD if threshold is None else threshold
+    plant_ids = np.asarray(plant_ids, dtype=np.int64)
+    top_ids = probabilities.argmax(axis=1)
+    if len(plant_ids) == 0:
+        return [(False, labels[i]) for i in top_ids]
+    plant_probs = probabilities[:, plant_ids]
+    is_plant = plant_probs.sum(axis=1) >= threshold
+    label_ids = np.where(is_plant, plant_ids[plant_probs.argmax(axis=1)], top_ids)
+    return [(bool(plant), labels[i]) for plant, i in zip(is_plant, label_ids)]
+
+
+# Runs both questions on a stack of decoded images, (N, H, W, 3) uint8, with one model call per model (one call in
+# total with the two-headed model). Returns one (is_plant, label, plant_class, confidence) tuple per image. Unlike
+# analyze_image, errors are raised rather than turned into placeholder results.
+def analyze_batch(uint8_batch):
+    if SHARED_MODEL:
+        probabilities, verdicts = _run_shared(uint8_batch, verbose=0)
+    else:
+        model = get_model()
+        if model is None:
+            raise RuntimeError("Model Error")
+        with instrumentation.stage("disease"):
+            probabilities = model.predict(_disease_input(uint8_batch), verbose=0)
+        verdicts = _run_validator(uint8_batch, verbose=0)
+    with instrumentation.stage("postprocess"):
+        return [tuple(verdict) + _top_class(probs) for verdict, probs in zip(verdicts, probabilities)]
+
+
+# 7. BATCHED INFERENCE
+def _safe_load(image_path):
+    # Returns (array, None) on success or (None, error message) so one bad file cannot stop a batch.
+    try:
+        return load_image_uint8(image_path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _iter_decoded_batches(image_paths, batch_size, max_workers):
+    # Yields (paths, [(array, error), ...]) per batch. Paths are pulled from the iterable lazily and the next batch is
+    # decoded in the background while the caller runs the model on the current one, so at most two batches are in
+    # memory no matter how many paths there are.
+    paths_iter = iter(image_paths)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = None
+        while True:
+            chunk = list(islice(paths_iter, batch_size))
+            if not chunk:
+                break
+            futures = [pool.submit(_safe_load, p) for p in chunk]
+            if pending is not None:
+                yield pending[0], [f.result() for f in pending[1]]
+            pending = (chunk, futures)
+        if pending is not None:
+            yield pending[0], [f.result() for f in pending[1]]
+
+
+def _stack_batch(decoded, batch_size):
+    # Stacks the decoded images into one fixed-size (batch_size, H, W, 3) array. Failed images and the
+    # tail of the last batch are zero padding, so the model always sees the same input shape.
+    batch = np.zeros((batch_size, IMG_SIZE[0], IMG_SIZE[1], 3), dtype=np.uint8)
+    valid = []
+    for i, (array, error) in enumerate(decoded):
+        if error is None:
+            batch[i] = array
+            valid.append(i)
+    return batch, valid
+
+
+def iter_batch_results(image_paths, batch_size=DEFAULT_BATCH_SIZE, max_workers=DECODE_WORKERS,
+                       predict=True, check_plant=False):
+    # Streams one result dict per path, in input order, as each batch finishes. Each image is decoded once and fed to
+    # the disease model (predict=True: "class", "confidence") and/or the gatekeeper (check_plant=True: "is_plant",
+    # "label"). "error" is None on success, otherwise a message; a failed image does not stop the rest of the batch.
+    # With the two-headed model one pass per batch gives both outputs
+    shared = SHARED_MODEL and (predict or check_plant)
+    model = get_model() if predict and not shared else None
+    class_names = get_class_names() if predict else []
+
+    for paths, decoded in _iter_decoded_batches(image_paths, batch_size, max_workers):
+        batch, valid = _stack_batch(decoded, batch_size)
+
+        predictions = None
+        disease_error = None
+        verdicts = None
+        plant_error = None
+        if shared and valid:
+            try:
+                predictions, verdicts = _run_shared(batch, verbose=0)
+            except Exception as e:
+                disease_error = plant_error = str(e)
+        elif predict:
+            if model is None:
+                disease_error = "Model Error"
+            elif valid:
+                try:
+                    with instrumentation.stage("disease"):
+                        predictions = model.predict(_disease_input(batch), verbose=0)
+                except Exception as e:
+                    disease_error = str(e)
+
+        if check_plant and valid and not shared:
+            try:
+                verdicts = _run_validator(batch, verbose=0)
+            except Exception as e:
+                plant_error = str(e)
+
+        for i, (_, decode_error) in enumerate(decoded):
+            result = {"path": paths[i], "error": decode_error}
+
+            if predict:
+                error = decode_error or disease_error
+                if error is not None:
+                    result.update({"class": None, "confidence": 0.0, "error": error})
+                else:
+                    class_index = int(np.argmax(predictions[i]))
+                    result["class"] = class_names[class_index]
+                    result["confidence"] = float(predictions[i][class_index]) * 100
+
+            if check_plant:
+                # Like check_if_plant, an image the gatekeeper could not look at is let through
+                error = decode_error or plant_error
+                if error is not None:
+                    result.update({"is_plant": True, "label": "Error", "error": result["error"] or error})
+                else:
+                    result["is_plant"], result["label"] = verdicts[i]
+
+            yield result
+
+
+def predict_probabilities(image_paths, batch_size=DEFAULT_BATCH_SIZE, max_workers=DECODE_WORKERS):
+    # Returns (probabilities, errors): a float32 (N, num_classes) array with the disease model's full output for each
+    # path, in input order, and a list with None or an error message per path. Rows of failed images are NaN.
+    model = get_shared_model() if SHARED_MODEL else get_model()
+    if model is None:
+        raise RuntimeError("Model Error")
+    rows, errors = [], []
+    for paths, decoded in _iter_decoded_batches(image_paths, batch_size, max_workers):
+        batch, valid = _stack_batch(decoded, batch_size)
+        with instrumentation.stage("disease"):
+            if SHARED_MODEL:
+                outputs = model.predict(_shared_input(batch), verbose=0)["disease"]
+            else:
+                outputs = model.predict(_disease_input(batch), verbose=0)
+        outputs = np.asarray(outputs, dtype=np.float32)[:len(paths)]
+        outputs[[i for i in range(len(paths)) if i not in valid]] = np.nan
+        rows.append(outputs)
+        errors.extend(error for _, error in decoded)
+    if not rows:
+        return np.zeros((0, len(get_class_names())), dtype=np.float32), []
+    return np.concatenate(rows), errors
+
 
-    # Print the top 3 guesses to see if the model is confused
-    top_3_indices = np.argsort(prediction[0])[-3:][::-1]
-    print("--- Model Top 3 Guesses ---")
-    for i in top_3_indices:
-        print(f"{class_names[i]}: {prediction[0][i] * 100:.2f}%")
-    print("!!")
+def predict_images(image_paths, batch_size=DEFAULT_BATCH_SIZE, max_workers=DECODE_WORKERS):
+    # Batched version of predict_image. Returns one dict per path, in input order:
+    # {"path", "class", "confidence", "error"}. A failed image gets class None and an error message.
+    return list(iter_batch_results(image_paths, batch_size, max_workers, predict=True))
 
-    class_index = np.argmax(prediction)
-    confidence = float(np.max(prediction)) * 100
 
-    return class_names[class_index], confidence
+def check_if_plants(image_paths, batch_size=DEFAULT_BATCH_SIZE, max_workers=DECODE_WORKERS):
+    # Batched version of check_if_plant. Returns one dict per path, in input order:
+    # {"path", "is_plant", "label", "error"}. Like check_if_plant, a failed image is let through
+    # with is_plant True and label "Error".
+    return list(iter_batch_results(image_paths, batch_size, max_workers, predict=False, check_plant=True))
@@ -0,0 +1,120 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Keeps track of the models used by the app. Each model is loaded the first time it is needed instead of
+# when a module is imported, and the registry can warm models up on a background thread so the GUI can paint its
+# window straight away and check the readiness state later.
+
+import threading
+import time
+
+# Readiness states
+NOT_LOADED = "not loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._status = {}
+        self._errors = {}
+        self._load_times = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    # Registers a loader function (no arguments, returns the model) under a name.
+    # Registering again replaces the loader and forgets anything loaded before.
+    def register(self, name, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._models.pop(name, None)
+            self._errors.pop(name, None)
+            self._load_times.pop(name, None)
+            self._status[name] = NOT_LOADED
+
+    # Puts an already built model in the registry (used by tests and benchmarks).
+    def set(self, name, model):
+        with self._lock:
+            self._locks.setdefault(name, threading.Lock())
+            self._loaders.setdefault(name, lambda: model)
+            self._models[name] = model
+            self._errors.pop(name, None)
+            self._status[name] = READY
+
+    # Returns the model, loading it on first use. If another thread is already loading it, this waits for that
+    # load instead of starting a second one. Returns None if the loader failed.
+    def get(self, name):
+        if self._status.get(name) == READY:
+            return self._models[name]
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'.")
+
+        with self._locks[name]:
+            status = self._status[name]
+            if status == READY:
+                return self._models[name]
+            if status == FAILED:
+                return None
+
+            self._status[name] = LOADING
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                print(f"Error loading {name}: {e}")
+                self._errors[name] = e
+                self._status[name] = FAILED
+                return None
+            self._load_times[name] = time.perf_counter() - start
+            self._models[name] = model
+            self._status[name] = READY
+            return model
+
+    def status(self, name):
+        return self._status.get(name, NOT_LOADED)
+
+    def is_ready(self, name):
+        return self.status(name) == READY
+
+    # True once every named model (default: all registered) has finished loading, successfully or not.
+    def all_settled(self, names=None):
+        names = self._loaders if names is None else names
+        return all(self.status(name) in (READY, FAILED) for name in names)
+
+    def error(self, name):
+        return self._errors.get(name)
+
+    # Seconds each model took to load, for the ones that have loaded.
+    def load_times(self):
+        return dict(self._load_times)
+
+    # Loads the named models (default: all registered). With background=True this returns the started daemon thread
+    # right away; on_done, if given, is called from that thread once everything has settled.
+    def warm_up(self, names=None, background=True, on_done=None):
+        names = list(self._loaders) if names is None else list(names)
+
+        def run():
+            for name in names:
+                self.get(name)
+            if on_done is not None:
+                on_done()
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    # Forgets a loaded (or failed) model so the next get() loads it again. Without a name, resets everything.
+    def reset(self, name=None):
+        names = list(self._loaders) if name is None else [name]
+        with self._lock:
+            for n in names:
+                self._models.pop(n, None)
+                self._errors.pop(n, None)
+                self._load_times.pop(n, None)
+                self._status[n] = NOT_LOADED
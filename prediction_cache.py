@@ -0,0 +1,121 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Cache for prediction results. Entries are keyed by the hash of the image file plus a fingerprint of the
+# models that produced them. Recent entries live in a small in-memory LRU; everything is also written to a SQLite file
+# so results survive a restart. Switching the model changes the fingerprint and so every key; entries of other models
+# are kept, so switching back finds them again. The disk table is pruned by age (max_age_days) and size
+# (max_disk_entries).
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    def __init__(self, db_path, max_entries=256, max_disk_entries=50000, max_age_days=30):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_prune = 0
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # The GUI reads and writes from a worker thread, so the connection is shared behind self._lock.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        with self._lock:
+            self._prune_disk()
+
+    # The key of one result: what was predicted ("disease", "plant"), by which models and for which image content
+    @staticmethod
+    def make_key(kind, file_hash, fingerprint):
+        return f"{kind}:{fingerprint}:{file_hash}"
+
+    # Returns the cached value, or None on a miss.
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            row = self._conn.execute("SELECT value FROM predictions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value = json.loads(row[0])
+            self._remember(key, value)
+            self.hits += 1
+            return value
+
+    # Stores a JSON-serialisable value in memory and on disk.
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+            self._conn.commit()
+
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 100:
+                self._prune_disk()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def prune(self):
+        with self._lock:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        # Drops rows older than max_age_days, then keeps the newest max_disk_entries (rowid grows with each insert).
+        self._puts_since_prune = 0
+        self._conn.execute("DELETE FROM predictions WHERE stored_at < ?",
+                           (time.time() - self.max_age_days * 86400,))
+        self._conn.execute(
+            "DELETE FROM predictions WHERE rowid NOT IN "
+            "(SELECT rowid FROM predictions ORDER BY rowid DESC LIMIT ?)",
+            (self.max_disk_entries,)
+        )
+        self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM predictions")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
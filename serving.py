@@ -0,0 +1,42 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Fast inference path for Keras models. keras Model.predict builds a data adapter and runs callback
+# machinery on every call, which costs tens of milliseconds before any math happens. ServingModel compiles the forward
+# pass once into a tf.function with a fixed (N, H, W, 3) float32 signature (optionally with XLA) and warms it up when
+# it is created, so the first prediction is as fast as the hundredth.
+
+import numpy as np
+
+
+class ServingModel:
+    def __init__(self, keras_model, jit_compile=False, warm_up_batch_sizes=(1,)):
+        import tensorflow as tf
+
+        self.keras_model = keras_model
+        self.input_shape = keras_model.input_shape
+        height, width, channels = self.input_shape[1:4]
+
+        # Batch dimension left open: without XLA one trace serves every batch size. XLA compiles once per batch size,
+        # which is why the batched code in model_predict always pads to the same size.
+        @tf.function(
+            input_signature=[tf.TensorSpec([None, height, width, channels], tf.float32)],
+            jit_compile=jit_compile,
+            reduce_retracing=True,
+        )
+        def forward(images):
+            return keras_model(images, training=False)
+
+        self._forward = forward
+        for batch_size in warm_up_batch_sizes:
+            self.predict(np.zeros((batch_size, height, width, channels), dtype=np.float32))
+
+    # Same call as keras Model.predict for the way model_predict uses it. A model with named outputs (the two-headed
+    # model) returns a dict of arrays.
+    def predict(self, batch, verbose=0):
+        outputs = self._forward(np.asarray(batch, dtype=np.float32))
+        if isinstance(outputs, dict):
+            return {name: value.numpy() for name, value in outputs.items()}
+        return outputs.numpy()
+
+    def __call__(self, batch):
+        return self.predict(batch)
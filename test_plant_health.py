@@ -2,13 +2,45 @@
 # Students: Faith Akinlade, Smit Desai, Pratham Waghela
 # Description: Testing file for various parts of plant health Checker program.
 
+import io
+import json
 import os
 import pytest
 import tensorflow as tf
 import numpy as np
 from PIL import Image
-from image_preprocessing_file import train_ds, val_ds, test_ds, class_names, IMG_SIZE
-from model_predict import predict_image, model  # Replace with actual filename if needed
+from image_preprocessing_file import build_datasets, IMG_SIZE
+from prediction_cache import PredictionCache
+import content_hash
+from history_store import HistoryStore
+from image_store import ImageStore
+from data_manager import PlantDataManager
+from check_fast_decode import compare_decodes, DEFAULT_FOLDER, DEFAULT_TOLERANCE
+from batch_predict import iter_image_paths
+from thumbnail_cache import ThumbnailCache
+from architectures import build_architecture
+import instrumentation
+import model_predict
+import thumbnail_cache
+from model_predict import (  # Replace with actual filename if needed
+    predict_image, predict_images, check_if_plant, analyze_image, model, plant_class_mask, plant_verdicts
+)
+
+# The tests use the tiny generated dataset so they run in seconds without PlantVillage.zip. Set PLANT_TEST_DATA_SOURCE
+# (zip, extract, shipped) to check a real source instead.
+datasets = build_datasets(os.environ.get("PLANT_TEST_DATA_SOURCE", "synthetic"))
+train_ds, val_ds, test_ds, class_names = datasets.train_ds, datasets.val_ds, datasets.test_ds, datasets.class_names
+
+
+# The prediction cache and thumbnails the tests create go to a temporary folder instead of the repo's cache/ folder
+@pytest.fixture(autouse=True)
+def temporary_cache_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_predict, "CACHE_PATH", str(tmp_path / "cache" / "predictions.sqlite3"))
+    monkeypatch.setattr(model_predict, "_prediction_cache", None)
+    monkeypatch.setattr(thumbnail_cache, "THUMBNAIL_DIR", str(tmp_path / "cache" / "thumbnails"))
+    yield
+    if model_predict._prediction_cache is not None:
+        model_predict._prediction_cache.close()
 
 
 # 1. Test that datasets are loaded and non-empty
@@ -62,3 +94,549 @@ def test_train_ds_normalization():
     assert tf.reduce_min(batch_images) >= 0.0
     # Labels should sum to 1 (categorical)
     assert tf.reduce_all(tf.reduce_sum(batch_labels, axis=1) == 1)
+
+# 6. Test batched prediction keeps input order and reports a bad file without failing the rest
+def test_predict_images_batch(tmp_path):
+    paths = []
+    for i in range(3):
+        img_path = tmp_path / f"batch_{i}.jpg"
+        Image.fromarray(np.uint8(np.random.rand(224, 224, 3) * 255)).save(img_path)
+        paths.append(str(img_path))
+    paths.insert(1, str(tmp_path / "missing.jpg"))
+
+    results = predict_images(paths, batch_size=2)
+
+    assert [r["path"] for r in results] == paths
+    assert results[1]["error"] is not None
+    for r in results[:1] + results[2:]:
+        assert r["error"] is None
+        assert r["class"] in class_names
+        assert 0 <= r["confidence"] <= 100
+
+# 7. Test the combined analysis gives the same answers as the two separate calls
+def test_analyze_image_matches_separate_calls(tmp_path):
+    img_path = tmp_path / "analyze.jpg"
+    Image.fromarray(np.uint8(np.random.rand(300, 400, 3) * 255)).save(img_path)
+
+    is_plant, detected_label, predicted_class, confidence = analyze_image(str(img_path))
+
+    assert (is_plant, detected_label) == check_if_plant(str(img_path))
+    expected_class, expected_confidence = predict_image(str(img_path))
+    assert predicted_class == expected_class
+    assert confidence == pytest.approx(expected_confidence, abs=1e-3)
+
+# 8. Test the prediction cache: LRU eviction, persistence on disk, keeping other models' entries and pruning by age
+def test_prediction_cache(tmp_path):
+    db_path = str(tmp_path / "predictions.sqlite3")
+    cache = PredictionCache(db_path, max_entries=2)
+    for i in range(3):
+        cache.put(cache.make_key("disease", f"hash{i}", "model-a"), ["Healthy", 90.0 + i])
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get(cache.make_key("disease", "hash0", "model-a")) == ["Healthy", 90.0]  # read back from disk
+    assert cache.get(cache.make_key("disease", "missing", "model-a")) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+    reopened = PredictionCache(db_path)
+    assert reopened.stats()["disk_entries"] == 3
+    assert reopened.get(reopened.make_key("disease", "hash1", "model-b")) is None
+    # switching back to the first model finds its results
+    assert reopened.get(reopened.make_key("disease", "hash1", "model-a")) == ["Healthy", 91.0]
+    reopened.max_age_days = 0
+    reopened.prune()
+    assert reopened.stats()["disk_entries"] == 0
+
+    memo_size = content_hash.MAX_MEMO_ENTRIES
+    content_hash.MAX_MEMO_ENTRIES = 2
+    try:
+        for i in range(4):
+            (tmp_path / f"memo_{i}.txt").write_text(str(i))
+            content_hash.file_digest(str(tmp_path / f"memo_{i}.txt"))
+        assert len(content_hash._digest_memo) == 2
+    finally:
+        content_hash.MAX_MEMO_ENTRIES = memo_size
+
+# 9. Test the pooled architectures build with the right output size and are far smaller than the Flatten baseline
+def test_architectures_shrink_head():
+    num_classes = len(class_names)
+    baseline = build_architecture("baseline", num_classes, IMG_SIZE)
+    for arch in ["gap", "separable"]:
+        model = build_architecture(arch, num_classes, IMG_SIZE)
+        assert model.name == arch
+        assert model.output_shape == (None, num_classes)
+        assert model.count_params() * 10 < baseline.count_params()
+
+# 10. Test stage timing: nothing is recorded while it is off, every stage of a prediction is recorded once it is on
+def test_stage_instrumentation(tmp_path):
+    # Two different images, so the second analysis is not answered from the prediction cache
+    paths = []
+    for name in ["untimed.jpg", "timed.jpg"]:
+        paths.append(str(tmp_path / name))
+        Image.fromarray(np.random.randint(0, 255, (300, 400, 3), dtype=np.uint8)).save(paths[-1])
+    instrumentation.reset()
+    instrumentation.disable()
+    analyze_image(paths[0])
+    assert instrumentation.snapshot() == {}
+
+    instrumentation.enable()
+    try:
+        analyze_image(paths[1])
+    finally:
+        instrumentation.disable()
+    stats = instrumentation.snapshot()
+    for stage in ["read", "decode", "resize", "gatekeeper", "disease", "postprocess"]:
+        assert stats[stage]["count"] >= 1
+    assert 'plant_stage_duration_seconds_count{stage="disease"}' in instrumentation.prometheus_text()
+
+# 11. Test the history store: batched writes, paging with filters and importing an old history_log.txt only once
+def test_history_store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"), batch_size=10)
+    for i in range(25):
+        plant_class = "Rust" if i % 2 else "Healthy"
+        store.add(plant_class, 80.0 + i, file_name=f"leaf{i}.jpg", gatekeeper_label="leaf",
+                  timestamp=f"2025-03-{1 + i // 10:02d} 12:00:{i:02d}")
+    assert store.count() == 25
+    page = store.query(limit=10, offset=0)
+    assert len(page) == 10 and page[0]["file_name"] == "leaf24.jpg"  # newest first
+    assert store.count(plant_class="Rust") == 12
+    assert store.count(date_from="2025-03-02", date_to="2025-03-02") == 10
+    assert store.classes() == ["Healthy", "Rust"]
+
+    log_path = tmp_path / "history_log.txt"
+    log_path.write_text("[2025-02-01 09:30:00] File: old.jpg | Result: Powdery (91.50%)\nnot a history line\n")
+    assert store.import_legacy_log(str(log_path)) == 1
+    assert store.import_legacy_log(str(log_path)) == 0
+    old = store.query(plant_class="Powdery")[0]
+    assert (old["file_name"], old["confidence"]) == ("old.jpg", 91.5)
+    store.close()
+
+# 12. Test the dataset manager: projection, pinned types, chunked filtering and a reload after the CSV changes
+def test_data_manager_cache(tmp_path):
+    csv_path = tmp_path / "plants.csv"
+    csv_path.write_text("plant,condition,score\nTomato,Rust,0.5\nCorn,Healthy,0.9\nTomato,Healthy,0.7\n")
+    manager = PlantDataManager(str(csv_path), dtypes={"score": "float32"}, cache_dir=str(tmp_path / "cache"))
+    assert manager.load_dataset(columns=["plant", "score"])
+    assert list(manager.data.columns) == ["plant", "score"]
+    assert str(manager.data["score"].dtype) == "float32"
+
+    tomatoes = manager.filter_rows(lambda chunk: chunk["plant"] == "Tomato", chunk_size=1)
+    assert len(tomatoes) == 2
+
+    with open(csv_path, "a") as f:
+        f.write("Apple,Powdery,0.2\n")
+    reloaded = PlantDataManager(str(csv_path), dtypes={"score": "float32"}, cache_dir=str(tmp_path / "cache"))
+    assert reloaded.load_dataset()
+    assert len(reloaded.data) == 4
+    assert not PlantDataManager(str(tmp_path / "missing.csv")).load_dataset()
+
+# 13. Test the reduced-size JPEG decode gives the same answers as a full decode on the shipped test photos
+def test_fast_decode_matches_full_decode():
+    paths = list(iter_image_paths(DEFAULT_FOLDER))[:5]
+    if not paths:
+        pytest.skip("No test photos in Plant Dataset/Test")
+    for result in compare_decodes(paths):
+        assert result["same_class"]
+        assert result["max_prob_diff"] <= DEFAULT_TOLERANCE
+
+# 14. Test previews keep the aspect ratio, follow the EXIF orientation and are reused from the thumbnail cache
+def test_thumbnail_cache(tmp_path):
+    img_path = str(tmp_path / "sideways.jpg")
+    img = Image.new("RGB", (400, 200), (30, 160, 40))
+    exif = img.getexif()
+    exif[0x0112] = 6  # stored sideways, shown rotated 90 degrees
+    img.save(img_path, exif=exif)
+
+    cache = ThumbnailCache(str(tmp_path / "thumbs"))
+    preview = cache.get(img_path, (380, 380))
+    assert preview.size == (190, 380)
+    cached_file = cache.path_for(img_path, (380, 380))
+    assert os.path.exists(cached_file)
+    assert cache.get(img_path, (380, 380)).size == (190, 380)
+    assert cache.get(img_path, (300, 100), mode="cover").size == (300, 100)
+
+# 15. Test the gatekeeper verdict sums the plant-class probabilities for a whole batch
+def test_plant_verdicts():
+    labels = [f"thing_{i}" for i in range(1000)]
+    labels[10], labels[11], labels[12] = "brown_bear", "teapot", "leaf_beetle"
+    plant_ids = np.flatnonzero(plant_class_mask(labels))
+    assert 12 in plant_ids and 987 in plant_ids  # keyword label and a listed plant class
+    assert 10 not in plant_ids and 11 not in plant_ids  # "ear" and "pot" only match whole words
+
+    probs = np.zeros((3, 1000))
+    probs[0, [1, 2, 985, 987]] = [0.5, 0.3, 0.08, 0.12]  # no plant class in the lead, but 0.2 plant mass in total
+    probs[1, [1, 987]] = [0.9, 0.1]
+    probs[2, 985] = 1.0
+    verdicts = plant_verdicts(probs, plant_ids, labels, threshold=0.15)
+    assert verdicts == [(True, labels[987]), (False, labels[1]), (True, labels[985])]
+    assert plant_verdicts(probs, [], labels) == [(False, labels[1]), (False, labels[1]), (False, labels[985])]
+
+# 16. Test the two-headed model answers both questions in one pass with the same plant verdict as the gatekeeper
+def test_shared_model(tmp_path):
+    import model_predict
+    from architectures import two_headed_outputs
+    from serving import ServingModel
+
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"shared_{i}.jpg"))
+        Image.fromarray(np.random.randint(0, 255, (300, 400, 3), dtype=np.uint8)).save(paths[-1])
+    expected = [check_if_plant(path) for path in paths]
+
+    two_headed = build_architecture("two_headed", len(model_predict.get_class_names()), IMG_SIZE)
+    model_predict.registry.set("shared", ServingModel(two_headed_outputs(two_headed)))
+    model_predict.set_shared_model(True)
+    try:
+        is_plant, label, predicted_class, confidence = analyze_image(paths[0])
+        assert (is_plant, label) == expected[0]
+        assert predicted_class in model_predict.get_class_names() and 0 <= confidence <= 100
+        results = model_predict.check_if_plants(paths)
+        assert [(r["is_plant"], r["label"]) for r in results] == expected
+    finally:
+        model_predict.set_shared_model(False)
+        model_predict.registry.reset("shared")
+
+# 17. Test the inference server batches concurrent uploads, answers over HTTP and turns uploads away when it is full
+def test_inference_server(tmp_path):
+    import io
+    import threading
+    import urllib.request
+    from inference_server import MicroBatcher, QueueFull, make_server
+
+    batch_sizes = []
+
+    def run_batch(images):
+        batch_sizes.append(len(images))
+        return [(True, "leaf", "Healthy", float(image.mean())) for image in images]
+
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=50, max_queue=8)
+    images = [np.full((*IMG_SIZE, 3), i, dtype=np.uint8) for i in range(8)]
+    futures = [batcher.submit(image) for image in images]
+    with pytest.raises(QueueFull):
+        batcher.submit(images[0])
+    batcher.start()
+    try:
+        assert [f.result(timeout=10)[3] for f in futures] == list(range(8))
+        assert batch_sizes == [4, 4]
+
+        server = make_server("127.0.0.1", 0, batcher)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            upload = io.BytesIO()
+            Image.fromarray(np.full((300, 400, 3), 7, dtype=np.uint8)).save(upload, format="JPEG")
+            url = f"http://127.0.0.1:{server.server_port}"
+            request = urllib.request.Request(f"{url}/predict", data=upload.getvalue(), method="POST")
+            with urllib.request.urlopen(request, timeout=10) as response:
+                result = json.loads(response.read())
+            assert result["class"] == "Healthy" and result["is_plant"] is True
+            with urllib.request.urlopen(f"{url}/metrics", timeout=10) as response:
+                metrics = response.read().decode()
+            assert 'plant_server_requests_total{outcome="ok"} 1' in metrics
+            assert "plant_server_queue_depth 0" in metrics
+        finally:
+            server.shutdown()
+            server.server_close()
+    finally:
+        batcher.stop()
+
+# 18. Test saved images are stored once per content: a repeated save returns the first copy, new photos get new names
+def test_image_store(tmp_path):
+    photo = tmp_path / "leaf.jpg"
+    other = tmp_path / "other.jpg"
+    Image.fromarray(np.random.randint(0, 255, (60, 80, 3), dtype=np.uint8)).save(photo)
+    Image.fromarray(np.random.randint(0, 255, (60, 80, 3), dtype=np.uint8)).save(other)
+    folder = tmp_path / "saved_images"
+
+    store = ImageStore(str(folder))
+    first_path, first_new = store.save(str(photo))
+    again_path, again_new = store.save(str(photo))
+    other_path, other_new = store.save(str(other))
+    assert first_new and not again_new and other_new
+    assert again_path == first_path and other_path != first_path
+    assert open(first_path, "rb").read() == photo.read_bytes()
+    # The friendly file is a copy: editing it in place leaves the stored blob alone
+    blob_path = store.blob_path(content_hash.file_digest(str(photo)))
+    with open(first_path, "r+b") as f:
+        f.write(b"edited")
+    assert open(blob_path, "rb").read() == photo.read_bytes()
+    assert os.stat(blob_path).st_mode & 0o777 == 0o444  # blobs are read-only
+    assert store.find(str(photo)) is None  # the edited file no longer holds the photo
+    first_path, first_new = store.save(str(photo))
+    assert first_new and open(first_path, "rb").read() == photo.read_bytes()
+    # The same bytes under another extension are the same photo
+    renamed = tmp_path / "leaf_copy.JPEG"
+    renamed.write_bytes(photo.read_bytes())
+    assert store.save(str(renamed)) == (first_path, False)
+
+    # A fresh store reads the index; a friendly file deleted by the user is put back on the next save
+    os.remove(first_path)
+    reloaded = ImageStore(str(folder))
+    assert reloaded.find(str(photo)) == first_path
+    assert reloaded.save(str(photo)) == (first_path, False)
+    assert os.path.exists(first_path)
+    os.remove(other_path)
+    assert reloaded.prune() == 1
+    assert list(reloaded.entries()) == [os.path.basename(first_path)]
+
+# 19. Test the evaluation scores and that a second evaluation reuses the stored model outputs
+def test_evaluate(tmp_path):
+    from evaluate import OutputStore, confusion_matrix, model_outputs, per_class_scores, score
+
+    matrix = confusion_matrix(np.array([0, 0, 1, 2, 2]), np.array([0, 1, 1, 2, 0]), 3)
+    assert matrix.tolist() == [[1, 1, 0], [0, 1, 0], [1, 0, 1]]
+    precision, recall, _ = per_class_scores(matrix)
+    assert precision.tolist() == pytest.approx([0.5, 0.5, 1.0])
+    assert recall.tolist() == pytest.approx([0.5, 1.0, 0.5])
+    outputs = np.array([[0.9, 0.1, 0.0], [0.4, 0.3, 0.3], [0.2, 0.7, 0.1]])
+    report = score(outputs, np.array([0, 1, 1]), 3, threshold=0.6)
+    assert report["coverage"] == pytest.approx(2 / 3) and report["accuracy"] == 1.0
+
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"eval_{i}.jpg"))
+        Image.fromarray(np.random.randint(0, 255, (120, 160, 3), dtype=np.uint8)).save(paths[-1])
+    store = OutputStore(str(tmp_path / "eval"))
+    first, errors, inferred = model_outputs(paths, store)
+    assert inferred == 3 and errors == [None, None, None]
+    again, _, inferred = model_outputs(paths, store)
+    assert inferred == 0
+    np.testing.assert_allclose(again, first)
+
+    # Nothing readable: no outputs to store, every file reported as an error
+    broken = tmp_path / "broken.jpg"
+    broken.write_bytes(b"not an image")
+    empty_store = OutputStore(str(tmp_path / "eval_empty"))
+    outputs, errors, inferred = model_outputs([str(broken)], empty_store)
+    assert inferred == 1 and errors[0] is not None and np.isnan(outputs).all()
+
+# 20. Test a batch run killed in the middle of a line resumes without the fragment or duplicate rows
+def test_batch_predict_resume(tmp_path):
+    import csv
+    import batch_predict
+
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    for i in range(3):
+        Image.fromarray(np.random.randint(0, 255, (60, 80, 3), dtype=np.uint8)).save(folder / f"photo_{i}.jpg")
+
+    for name in ["results.jsonl", "results.csv"]:
+        output = tmp_path / name
+        assert batch_predict.main([str(folder), "-o", str(output)]) == 0
+        complete = output.read_bytes()
+        # Killed while writing the last record: keep the first rows and half of the last one
+        last_line_start = complete.rstrip(b"\n").rfind(b"\n") + 1
+        output.write_bytes(complete[:last_line_start + 10])
+
+        assert batch_predict.main([str(folder), "-o", str(output)]) == 0
+        with open(output, newline="") as f:
+            if name.endswith(".csv"):
+                rows = list(csv.DictReader(f))
+            else:
+                rows = [json.loads(line) for line in f]
+        assert sorted(row["path"] for row in rows) == sorted(str(p) for p in folder.iterdir())
+
+# 21. Test reading PlantVillage-style images straight from the zip matches reading the extracted folders
+def test_zip_index_matches_extracted(tmp_path):
+    import zipfile
+    from zip_dataset import ZipImageIndex
+
+    zip_path = tmp_path / "PlantVillage.zip"
+    counts = {"train": {"Healthy": 3, "Rust": 2}, "val": {"Healthy": 1, "Rust": 2}}
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for split, classes in counts.items():
+            for class_name, count in classes.items():
+                for i in range(count):
+                    buffer = io.BytesIO()
+                    pixels = np.random.randint(0, 255, (40, 50, 3), dtype=np.uint8)
+                    Image.fromarray(pixels).save(buffer, "PNG")
+                    zf.writestr(f"PlantVillage/{split}/{class_name}/img_{i}.png", buffer.getvalue())
+        zf.writestr("PlantVillage/readme.txt", "not an image")
+    with zipfile.ZipFile(zip_path) as zf:
+        zf.extractall(tmp_path / "data_cache")
+
+    index = ZipImageIndex(str(zip_path))
+    try:
+        assert index.class_names("train") == ["Healthy", "Rust"]
+        assert {split: len(entries) for split, entries in index.splits.items()} == {"train": 5, "val": 3}
+        from_zip = index.dataset("train", IMG_SIZE, batch_size=8, shuffle=False)
+        from_folder = tf.keras.utils.image_dataset_from_directory(
+            str(tmp_path / "data_cache" / "PlantVillage" / "train"), image_size=IMG_SIZE, batch_size=8,
+            label_mode="categorical", shuffle=False)
+        assert from_zip.class_names == from_folder.class_names
+        assert [os.path.relpath(p, str(zip_path)) for p in from_zip.file_paths] == \
+            [os.path.relpath(p, str(tmp_path / "data_cache")) for p in from_folder.file_paths]
+        zip_images, zip_labels = next(iter(from_zip))
+        folder_images, folder_labels = next(iter(from_folder))
+        np.testing.assert_allclose(zip_images.numpy(), folder_images.numpy(), atol=1e-3)
+        np.testing.assert_array_equal(zip_labels.numpy(), folder_labels.numpy())
+    finally:
+        index.close()
+
+# 22. Test the pipeline caches in RAM only when the images fit the memory budget and sizes the shuffle buffer from it
+def test_pipeline_memory_budget(monkeypatch):
+    import image_preprocessing_file as pipeline
+
+    monkeypatch.setattr(pipeline, "PIPELINE_CACHE", "auto")
+    monkeypatch.setattr(pipeline, "PIPELINE_MEMORY_MB", 100)
+    monkeypatch.setattr(pipeline, "SHUFFLE_MEMORY_MB", 10)
+    assert pipeline.cache_mode(500, (224, 224)) == "memory"  # about 72 MB
+    assert pipeline.cache_mode(54000, (224, 224)) == os.path.join(pipeline.PIPELINE_CACHE_DIR, "224x224")
+    assert pipeline.shuffle_buffer_size(54000, (224, 224)) == 69
+    assert pipeline.shuffle_buffer_size(20, (224, 224)) == 20
+    monkeypatch.setattr(pipeline, "PIPELINE_CACHE", "none")
+    assert pipeline.cache_mode(54000, (224, 224)) == "none"
+
+# 23. Test the app feeds a trained mobilenet_v2 model the same input range as training does
+def test_predict_image_matches_training_input(tmp_path, monkeypatch):
+    from serving import ServingModel
+
+    model = build_architecture("mobilenet_v2", len(class_names), IMG_SIZE)
+    model.compile(optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"])
+    model.fit(train_ds, epochs=1, verbose=0)
+    images, _ = next(iter(test_ds))
+    expected = model.predict(images[:1], verbose=0)[0]
+
+    img_path = str(tmp_path / "leaf.png")
+    Image.fromarray(np.round(images[0].numpy() * 255).astype(np.uint8)).save(img_path)
+    monkeypatch.setattr(model_predict, "CACHE_ENABLED", False)
+    model_predict.registry.set("disease", ServingModel(model))
+    try:
+        label, confidence = predict_image(img_path)
+        probabilities, errors = model_predict.predict_probabilities([img_path])
+    finally:
+        model_predict.registry.reset("disease")
+    assert label == model_predict.get_class_names()[int(np.argmax(expected))]
+    assert confidence == pytest.approx(float(expected.max()) * 100, abs=0.01)
+    assert errors == [None]
+    np.testing.assert_allclose(probabilities[0], expected, atol=1e-4)
+
+# 24. Test the on-disk pipeline cache is rebuilt when the images change and does not depend on the batch size
+def test_pipeline_file_cache_follows_source(tmp_path):
+    import glob
+    import image_preprocessing_file as pipeline
+
+    folder = tmp_path / "Train"
+    for class_name in ["Healthy", "Rust"]:
+        (folder / class_name).mkdir(parents=True)
+        for i in range(2):
+            Image.new("RGB", (32, 32), (40 + 100 * i, 120, 60)).save(folder / class_name / f"{i}.png")
+    prefix = str(tmp_path / "pipeline" / "32x32")
+
+    def load(batch_size):
+        raw = pipeline._directory_dataset(str(folder), (32, 32), batch_size)
+        ds = pipeline.optimize(raw, "shipped_train", len(raw.file_paths), batch_size, img_size=(32, 32), mode=prefix)
+        batches = list(ds)
+        return [int(images.shape[0]) for images, _ in batches], sorted(
+            float(image.numpy().mean()) for images, _ in batches for image in images)
+
+    sizes, means = load(batch_size=4)
+    assert sizes == [4]
+    cache_files = glob.glob(prefix + "_shipped_train_*")
+    assert cache_files
+
+    # Another batch size reads the same cached images
+    sizes, cached_means = load(batch_size=3)
+    assert sizes == [3, 1] and cached_means == pytest.approx(means)
+
+    # A new image and a rewritten one: a new cache is built from the current files and the old one removed
+    Image.new("RGB", (32, 32), (250, 250, 250)).save(folder / "Rust" / "2.png")
+    Image.new("RGB", (32, 32), (0, 0, 0)).save(folder / "Healthy" / "0.png")
+    sizes, new_means = load(batch_size=4)
+    assert sizes == [4, 1]
+    assert min(new_means) == 0.0 and max(new_means) == pytest.approx(250 / 255)
+    assert not set(cache_files) & set(glob.glob(prefix + "_shipped_train_*"))
+
+# 25. Test rows that recorded an error are retried on resume and a run with no model exits with an error code
+def test_batch_predict_retries_failed_rows(tmp_path, monkeypatch):
+    import batch_predict
+
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    paths = []
+    for i in range(2):
+        paths.append(str(folder / f"photo_{i}.jpg"))
+        Image.fromarray(np.random.randint(0, 255, (60, 80, 3), dtype=np.uint8)).save(paths[-1])
+    output = tmp_path / "results.jsonl"
+    output.write_text(json.dumps({"path": paths[0], "class": "Tomato___healthy", "confidence": 90.0, "error": None})
+                      + "\n" + json.dumps({"path": paths[1], "class": None, "confidence": 0.0,
+                                           "error": "Model Error"}) + "\n")
+
+    assert batch_predict.main([str(folder), "-o", str(output)]) == 0
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row["path"] for row in rows] == paths
+    assert rows[0]["confidence"] == 90.0 and rows[1]["error"] is None
+
+    with monkeypatch.context() as patch:
+        patch.setattr(model_predict, "get_model", lambda: None)
+        assert batch_predict.main([str(folder), "-o", str(tmp_path / "none.jsonl")]) == 1
+    assert not (tmp_path / "none.jsonl").exists()
+
+    broken = tmp_path / "broken"
+    broken.mkdir()
+    (broken / "bad.jpg").write_bytes(b"not an image")
+    assert batch_predict.main([str(broken), "-o", str(tmp_path / "bad.jsonl")]) == 1
+
+# 26. Test the cache key follows the disease model that is loaded, not just the current settings
+def test_cache_key_follows_loaded_model(tmp_path, monkeypatch):
+    import shutil
+
+    model_predict.get_model()
+    loaded_key = model_predict.model_fingerprint()
+    other_path = tmp_path / "other_model.keras"
+    shutil.copyfile(model_predict.model_path, other_path)
+    try:
+        with monkeypatch.context() as patch:
+            patch.setattr(model_predict, "model_path", str(other_path))
+            assert model_predict.model_fingerprint() == loaded_key  # still answering with the model loaded before
+            model_predict.registry.reset("disease")
+            assert model_predict.model_fingerprint() != loaded_key  # the next load reads the other file
+            model_predict.get_model()
+            assert model_predict.model_fingerprint() != loaded_key
+    finally:
+        model_predict.registry.reset("disease")
+    assert model_predict.model_fingerprint() == loaded_key
+
+# 27. Test a cancelled analysis stops before the models run and a live one still gives the full answer
+def test_analyze_image_cancelled(tmp_path):
+    img_path = str(tmp_path / "leaf.jpg")
+    Image.fromarray(np.random.randint(0, 255, (120, 160, 3), dtype=np.uint8)).save(img_path)
+    checks = []
+
+    def cancel_after_decode():
+        checks.append(True)
+        return len(checks) > 1
+
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        assert analyze_image(img_path, cancelled=lambda: True) is None
+        assert analyze_image(img_path, cancelled=cancel_after_decode) is None
+        assert not {"gatekeeper", "disease", "shared"} & set(instrumentation.snapshot())
+    finally:
+        instrumentation.disable()
+    assert len(analyze_image(img_path, cancelled=lambda: False)) == 4
+
+# 28. Test a model recorded with another input scale is refused and an unrecorded one loads with a warning
+def test_model_input_scale_record(tmp_path, monkeypatch, capsys):
+    import shutil
+    import model_info
+
+    model_file = tmp_path / "plant_health_model.keras"
+    shutil.copyfile(model_predict.model_path, model_file)
+    assert model_info.recorded_input_scale(str(model_file)) is None
+    assert model_info.check_input_scale(str(model_file), 1 / 255) is False
+    assert "Retrain" in capsys.readouterr().out
+
+    model_info.record_models([str(model_file)], 1 / 255, arch="baseline")
+    assert model_info.check_input_scale(str(model_file), 1 / 255) is True
+    model_info.record_models([str(model_file)], 1.0)  # e.g. a model trained on raw 0-255 pixels
+    with pytest.raises(ValueError):
+        model_info.check_input_scale(str(model_file), 1 / 255)
+
+    try:
+        with monkeypatch.context() as patch:
+            patch.setattr(model_predict, "model_path", str(model_file))
+            model_predict.registry.reset("disease")
+            assert model_predict.get_model() is None
+            assert "Retrain" in str(model_predict.registry.error("disease"))
+    finally:
+        model_predict.registry.reset("disease")
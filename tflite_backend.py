@@ -0,0 +1,93 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: TensorFlow Lite version of the disease model for low-end laptops. export_tflite_models() writes float16
+# and int8 post-training-quantized copies of the trained Keras model; TFLiteModel runs one of them with the same
+# predict() call that model_predict uses for the Keras model.
+
+import os
+import threading
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TFLITE_PATHS = {
+    "fp16": os.path.join(BASE_DIR, "plant_health_model_fp16.tflite"),
+    "int8": os.path.join(BASE_DIR, "plant_health_model_int8.tflite"),
+}
+
+# Number of training batches used to calibrate the int8 ranges
+CALIBRATION_BATCHES = 20
+
+
+# 1. EXPORT
+def _representative_dataset(calibration_ds, num_batches, input_scale):
+    # calibration_ds yields (images, labels) with images in [0, 1] (image_preprocessing_file.train_ds). The converter
+    # has to see the same values the model gets at prediction time, so the images are scaled the way model_predict
+    # scales its input.
+    def generator():
+        for images, _ in calibration_ds.take(num_batches):
+            images = images.numpy() * 255.0 * input_scale
+            for image in images:
+                yield [image[np.newaxis].astype(np.float32)]
+    return generator
+
+
+def export_tflite_models(keras_model, calibration_ds, input_scale=1.0 / 255.0, num_batches=CALIBRATION_BATCHES,
+                         paths=None):
+    import tensorflow as tf
+    paths = paths or TFLITE_PATHS
+
+    # float16: weights stored as float16, roughly half the size, no calibration needed
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    with open(paths["fp16"], "wb") as f:
+        f.write(converter.convert())
+    print(f"Saved {paths['fp16']}")
+
+    # int8: weights and activations quantized using ranges from training images. Input and output stay float32 so
+    # the model is a drop-in replacement.
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = _representative_dataset(calibration_ds, num_batches, input_scale)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(paths["int8"], "wb") as f:
+        f.write(converter.convert())
+    print(f"Saved {paths['int8']}")
+    return paths
+
+
+# 2. RUNTIME
+def _make_interpreter(model_path, num_threads):
+    # The standalone LiteRT runtime loads much faster than TensorFlow; fall back to tf.lite if it is not installed.
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+
+class TFLiteModel:
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = model_path
+        self._interpreter = _make_interpreter(model_path, num_threads or os.cpu_count())
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = None
+        # An interpreter can only run one call at a time
+        self._lock = threading.Lock()
+        self.input_shape = (None,) + tuple(int(d) for d in self._input["shape"][1:])
+
+    # Same call as keras Model.predict for the way model_predict uses it: a float32 (N, H, W, 3) batch in,
+    # (N, num_classes) probabilities out.
+    def predict(self, batch, verbose=0):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input["index"], list(batch.shape))
+                self._interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+            self._interpreter.set_tensor(self._input["index"], batch)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output["index"]).copy()
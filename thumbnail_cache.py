@@ -0,0 +1,90 @@
+# Project: Plant Health Checker
+# Authors: Faith Akinlade, Smit Desai, Pratham Waghela (Group 7)
+# Description: Preview images for the GUI. make_thumbnail() decodes a JPEG at reduced size (draft mode), applies the
+# EXIF orientation and scales it down without distorting it: "fit" keeps the whole picture inside the box, "cover"
+# fills the box and crops the overflow (used for the window background). ThumbnailCache keeps the results on disk keyed
+# by the file's content hash, the box size and the mode, so showing a recent image again, or a copy of it in the
+# saved-images folder, only reads a small JPEG.
+
+import os
+import threading
+from PIL import Image, ImageOps
+from content_hash import file_digest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+THUMBNAIL_DIR = os.path.join(BASE_DIR, "cache", "thumbnails")
+MAX_THUMBNAILS = 500
+THUMBNAIL_QUALITY = 90
+
+
+def make_thumbnail(image_path, size, mode="fit"):
+    img = Image.open(image_path)
+    if img.format == "JPEG":
+        # Decode at the smallest 1/2, 1/4 or 1/8 scale that still covers the box in either orientation (the EXIF
+        # rotation below may swap width and height)
+        longest = max(size)
+        img.draft("RGB", (longest, longest))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    if mode == "cover":
+        return ImageOps.fit(img, size, Image.LANCZOS)
+    img.thumbnail(size, Image.LANCZOS)
+    return img
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir=None, max_files=MAX_THUMBNAILS):
+        self.cache_dir = cache_dir or THUMBNAIL_DIR
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+    def path_for(self, image_path, size, mode="fit"):
+        return os.path.join(self.cache_dir, f"{file_digest(image_path)}_{size[0]}x{size[1]}_{mode}.jpg")
+
+    # Returns the preview as a loaded PIL image, making and storing it on first use.
+    def get(self, image_path, size, mode="fit"):
+        cached_path = self.path_for(image_path, size, mode)
+        if os.path.exists(cached_path):
+            try:
+                with Image.open(cached_path) as img:
+                    img.load()
+                os.utime(cached_path)  # most recently used thumbnails survive pruning
+                return img
+            except OSError:
+                pass  # damaged file; make it again
+
+        img = make_thumbnail(image_path, size, mode)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Written under a temporary name and renamed, so a reader never sees half a file
+            tmp_path = f"{cached_path}.{threading.get_ident()}.tmp"
+            img.save(tmp_path, "JPEG", quality=THUMBNAIL_QUALITY)
+            os.replace(tmp_path, cached_path)
+            self._maybe_prune()
+        except OSError as e:
+            print(f"Could not cache thumbnail: {e}")
+        return img
+
+    def _maybe_prune(self):
+        # Every 50 new thumbnails, delete the least recently used ones above max_files
+        with self._lock:
+            self._writes_since_prune += 1
+            if self._writes_since_prune < 50:
+                return
+            self._writes_since_prune = 0
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_files:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
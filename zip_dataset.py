@@ -0,0 +1,80 @@
+# Project: Plant Health Checker
+# Students: Smit Desai, Faith Akinlade, Pratham Waghela (Group 7)
+# Description: Reads training images straight out of a zip archive (e.g. PlantVillage.zip) without extracting it.
+# The zip's central directory is indexed once; image bytes are then read on demand inside the tf.data pipeline.
+# Labels come from the member paths: <anything>/<split>/<Class>/<image>, e.g. "PlantVillage/train/Rust/abc.jpg".
+
+import os
+import zipfile
+import numpy as np
+import tensorflow as tf
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif")
+
+
+class ZipImageIndex:
+    def __init__(self, zip_path):
+        self.zip_path = zip_path
+        # One shared handle: zipfile serialises the seek+read per member internally, so several tf.data threads can
+        # read different members at once while the decoding itself runs in parallel.
+        self._zip = zipfile.ZipFile(zip_path, "r")
+        self._members = {}
+        self.splits = {}
+
+        for info in self._zip.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            parts = info.filename.split("/")
+            if len(parts) < 3:
+                continue
+            split, class_name = parts[-3], parts[-2]
+            self.splits.setdefault(split, []).append((info.filename, class_name))
+            self._members[info.filename] = info
+
+        for split in self.splits:
+            self.splits[split].sort()
+
+    def class_names(self, split):
+        # Sorted the same way as image_dataset_from_directory sorts folder names
+        return sorted({class_name for _, class_name in self.splits.get(split, [])})
+
+    def read(self, member_name):
+        if isinstance(member_name, bytes):
+            member_name = member_name.decode("utf-8")
+        return self._zip.read(self._members[member_name])
+
+    # Builds a batched dataset of (float32 image in 0-255, label) like image_dataset_from_directory, with the same
+    # .class_names and .file_paths attributes.
+    def dataset(self, split, image_size, batch_size, label_mode="categorical", shuffle=True, seed=None,
+                class_names=None):
+        if split not in self.splits:
+            raise FileNotFoundError(f"No '{split}' folder found inside {self.zip_path}.")
+
+        class_names = class_names or self.class_names(split)
+        class_index = {name: i for i, name in enumerate(class_names)}
+        entries = [(name, class_index[cls]) for name, cls in self.splits[split] if cls in class_index]
+        names = [name for name, _ in entries]
+        labels = np.array([label for _, label in entries], dtype=np.int32)
+
+        ds = tf.data.Dataset.from_tensor_slices((names, labels))
+        if shuffle:
+            ds = ds.shuffle(len(names), seed=seed, reshuffle_each_iteration=True)
+
+        num_classes = len(class_names)
+
+        def load(name, label):
+            data = tf.numpy_function(self.read, [name], tf.string, stateful=False)
+            image = tf.io.decode_image(data, channels=3, expand_animations=False)
+            image = tf.image.resize(image, image_size)
+            image.set_shape((image_size[0], image_size[1], 3))
+            if label_mode == "categorical":
+                label = tf.one_hot(label, num_classes)
+            return image, label
+
+        ds = ds.map(load, num_parallel_calls=tf.data.AUTOTUNE).batch(batch_size)
+        ds.class_names = class_names
+        ds.file_paths = [os.path.join(self.zip_path, name) for name in names]
+        return ds
+
+    def close(self):
+        self._zip.close()